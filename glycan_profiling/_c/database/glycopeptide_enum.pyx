@@ -0,0 +1,92 @@
+# cython: embedsignature=True
+
+cimport cython
+from cpython.list cimport PyList_Append, PyList_Size, PyList_GET_ITEM
+from cpython.tuple cimport PyTuple_Size, PyTuple_GET_ITEM
+
+from itertools import combinations, islice
+
+from glypy.composition import formula
+
+
+cdef size_t MAX_SITE_COMBINATIONS = 100
+
+
+@cython.boundscheck(False)
+cpdef list enumerate_glycoforms(object peptide, object reference, object peptide_composition,
+                                object glycan_combinations, object unoccupied_sites, size_t size,
+                                str modification_name, double water_mass):
+    """Generate the glycopeptide records for every placement of each glycan combination
+    of `size` glycans on `size` of the `unoccupied_sites` of `peptide`.
+
+    The glycosylated sequence for each site combination is formatted once and shared across
+    all glycan combinations, and each glycan combination is formatted once rather than once
+    per site combination.
+
+    Parameters
+    ----------
+    peptide : :class:`~.Peptide`
+        The peptide record being glycosylated
+    reference : :class:`~.PeptideSequence`
+        The parsed peptide sequence to clone for each glycoform
+    peptide_composition : :class:`~.Composition`
+        The elemental composition of the peptide
+    glycan_combinations : list of :class:`GlycanCombinationRecord`
+        The glycan combinations to place
+    unoccupied_sites : :class:`~.Iterable` of :class:`int`
+        The glycosylation sites not already occupied in `reference`
+    size : int
+        The number of glycans in each of `glycan_combinations`
+    modification_name : str
+        The name of the glycosylation modification to place at each site
+    water_mass : float
+        The mass of a water molecule, lost per glycosidic bond
+
+    Returns
+    -------
+    list of dict
+    """
+    cdef:
+        list result, site_sequences
+        tuple site_set
+        size_t i, j, n_site_sets, n_sites
+        double peptide_mass, total_mass
+        str glycan_string, sequence_string
+        object gc, sequence, formula_string
+        object peptide_id, protein_id, hypothesis_id
+
+    result = []
+    if not glycan_combinations:
+        return result
+    site_sequences = []
+    for site_set in islice(combinations(unoccupied_sites, size), MAX_SITE_COMBINATIONS + 1):
+        sequence = reference.clone()
+        n_sites = PyTuple_Size(site_set)
+        for j in range(n_sites):
+            sequence.add_modification(<object>PyTuple_GET_ITEM(site_set, j), modification_name)
+        PyList_Append(site_sequences, sequence.get_sequence(include_glycan=False))
+    n_site_sets = PyList_Size(site_sequences)
+    if n_site_sets == 0:
+        return result
+
+    peptide_mass = peptide.calculated_mass
+    peptide_id = peptide.id
+    protein_id = peptide.protein_id
+    hypothesis_id = peptide.hypothesis_id
+
+    for gc in glycan_combinations:
+        total_mass = peptide_mass + gc.calculated_mass - (gc.count * water_mass)
+        formula_string = formula(peptide_composition + gc.dehydrated_composition())
+        glycan_string = str(gc.convert())
+        for i in range(n_site_sets):
+            sequence_string = <str>PyList_GET_ITEM(site_sequences, i)
+            PyList_Append(result, {
+                "calculated_mass": total_mass,
+                "formula": formula_string,
+                "glycopeptide_sequence": sequence_string + glycan_string,
+                "peptide_id": peptide_id,
+                "protein_id": protein_id,
+                "hypothesis_id": hypothesis_id,
+                "glycan_combination_id": gc.id,
+            })
+    return result
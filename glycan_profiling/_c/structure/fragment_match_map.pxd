@@ -82,6 +82,7 @@ cdef class FragmentMatchMap(object):
         public ByPeakIndex by_peak
 
     cpdef add(self, peak, fragment=*)
+    cdef int add_peak_fragment(self, DeconvolutedPeak peak, object fragment) except -1
 
     cpdef set fragments(self)
     cpdef FragmentMatchMap copy(self)
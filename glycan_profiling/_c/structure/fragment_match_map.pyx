@@ -435,6 +435,19 @@ cdef class FragmentMatchMap(object):
         self.by_fragment.invalidate()
         self.by_peak.invalidate()
 
+    cdef int add_peak_fragment(self, DeconvolutedPeak peak, object fragment) except -1:
+        """A C-level equivalent of :meth:`add` for a known peak and fragment, used
+        by the matching loops which add a pair for every matched peak.
+
+        The indices are only invalidated if they have been built.
+        """
+        PySet_Add(self.members, PeakFragmentPair._create(peak, fragment))
+        if self.by_fragment._mapping is not None:
+            self.by_fragment.invalidate()
+        if self.by_peak._mapping is not None:
+            self.by_peak.invalidate()
+        return 0
+
     def pairs_by_name(self, name):
         pairs = []
         for pair in self:
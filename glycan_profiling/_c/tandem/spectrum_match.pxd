@@ -12,6 +12,7 @@ cdef class ScoreSet(object):
     cpdef bint _gt(self, ScoreSet other)
     cpdef bint _eq(self, ScoreSet other)
     cpdef bytearray pack(self)
+    cpdef ScoreSet copy(self)
 
     @staticmethod
     cdef ScoreSet _create(double glycopeptide_score, double peptide_score, double glycan_score, double glycan_coverage)
@@ -27,6 +28,7 @@ cdef class FDRSet(object):
     cpdef bint _gt(self, FDRSet other)
     cpdef bint _eq(self, FDRSet other)
     cpdef bytearray pack(self)
+    cpdef FDRSet copy(self)
 
     @staticmethod
     cdef FDRSet _create(double total_q_value, double peptide_q_value, double glycan_q_value, double glycopeptide_q_value)
\ No newline at end of file
@@ -44,6 +44,10 @@ cdef class ScoreSet(object):
         self.glycan_coverage = glycan_coverage
         return self
 
+    cpdef ScoreSet copy(self):
+        return ScoreSet._create(
+            self.glycopeptide_score, self.peptide_score, self.glycan_score, self.glycan_coverage)
+
     def __eq__(self, other):
         return self._eq(other)
 
@@ -230,6 +234,10 @@ cdef class FDRSet(object):
         self.glycopeptide_q_value = glycopeptide_q_value
         return self
 
+    cpdef FDRSet copy(self):
+        return FDRSet._create(
+            self.total_q_value, self.peptide_q_value, self.glycan_q_value, self.glycopeptide_q_value)
+
     cpdef bytearray pack(self):
         cdef:
             double[4] data
@@ -269,4 +277,58 @@ cdef class FDRSet(object):
 
     def __reduce__(self):
         return self.__class__, (self.total_q_value, self.peptide_q_value,
-                                self.glycan_q_value, self.glycopeptide_q_value)
\ No newline at end of file
+                                self.glycan_q_value, self.glycopeptide_q_value)
+
+cdef inline bint _score_set_meets_thresholds(ScoreSet score_set, double* thresholds, Py_ssize_t n):
+    if n > 0 and score_set.glycopeptide_score < thresholds[0]:
+        return False
+    if n > 1 and score_set.peptide_score < thresholds[1]:
+        return False
+    if n > 2 and score_set.glycan_score < thresholds[2]:
+        return False
+    if n > 3 and score_set.glycan_coverage < thresholds[3]:
+        return False
+    return True
+
+
+@cython.binding(True)
+def MinimumMultiScoreRetentionStrategy_filter_matches(self, solution_set):
+    """Filter :class:`SpectrumMatch` objects whose :attr:`score_set` falls below
+    any of the dimensions of :attr:`threshold`, comparing :class:`ScoreSet` fields
+    directly rather than iterating over them.
+
+    Parameters
+    ----------
+    solution_set : list
+        The list of :class:`SpectrumMatch` objects to filter.
+
+    Returns
+    -------
+    list
+    """
+    cdef:
+        list retain
+        tuple threshold
+        double[4] thresholds
+        Py_ssize_t i, n
+        bint keep
+        object match, score_set, score_i, ref_i
+
+    threshold = tuple(self.threshold)
+    n = len(threshold)
+    for i in range(min(n, 4)):
+        thresholds[i] = threshold[i]
+    retain = []
+    for match in solution_set:
+        score_set = match.score_set
+        if n <= 4 and type(score_set) is ScoreSet:
+            keep = _score_set_meets_thresholds(<ScoreSet>score_set, thresholds, n)
+        else:
+            keep = True
+            for score_i, ref_i in zip(score_set, threshold):
+                if score_i < ref_i:
+                    keep = False
+                    break
+        if keep:
+            retain.append(match)
+    return retain
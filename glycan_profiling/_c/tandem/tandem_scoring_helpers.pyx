@@ -11,7 +11,7 @@ cimport numpy as np
 np.import_array()
 from numpy.math cimport isnan, log2l
 
-from ms_deisotope._c.peak_set cimport DeconvolutedPeak, DeconvolutedPeakSet
+from ms_deisotope._c.peak_set cimport DeconvolutedPeak, DeconvolutedPeakSet, DeconvolutedPeakSetIndexed
 
 from glycan_profiling._c.structure.fragment_match_map cimport (
     FragmentMatchMap, PeakFragmentPair)
@@ -38,6 +38,84 @@ IonSeries_precursor = IonSeries.precursor
 cdef object zeros = np.zeros
 cdef object np_float64 = np.float64
 
+
+cdef np.ndarray _build_peak_mask(DeconvolutedPeakSet spectrum, set masked_peaks):
+    """Convert the set of masked peak indices into an array with one flag per peak
+    of `spectrum` so the matching loops can test a peak with a single load instead
+    of boxing and hashing its index.
+    """
+    cdef:
+        np.ndarray[np.uint8_t, ndim=1, mode="c"] mask
+        size_t n
+        object ix
+
+    n = spectrum.get_size()
+    # Always allocate at least one cell so the buffer has a valid address
+    mask = zeros(max(n, 1), dtype=np.uint8)
+    if masked_peaks:
+        for ix in masked_peaks:
+            if isinstance(ix, int) and 0 <= ix < n:
+                mask[<size_t>ix] = 1
+    return mask
+
+
+cdef DeconvolutedPeakSetIndexed _as_indexed(DeconvolutedPeakSet spectrum):
+    """Return `spectrum` with its index ready if it supports interval search, otherwise `None`"""
+    cdef DeconvolutedPeakSetIndexed indexed_spectrum
+    if not isinstance(spectrum, DeconvolutedPeakSetIndexed):
+        return None
+    indexed_spectrum = <DeconvolutedPeakSetIndexed>spectrum
+    if not indexed_spectrum.indexed:
+        indexed_spectrum.reindex()
+    return indexed_spectrum
+
+
+cdef inline bint _peak_interval(DeconvolutedPeakSetIndexed spectrum, double mass, double error_tolerance,
+                                size_t* start, size_t* end):
+    """Locate the half-open range of peak positions in `spectrum` within `error_tolerance` of `mass`.
+
+    Returns whether any peak matched.
+    """
+    if spectrum._size == 0:
+        return False
+    return spectrum._interval_for(mass, error_tolerance, start, end) == 0
+
+
+@cython.boundscheck(False)
+cdef int _match_fragment_peaks(DeconvolutedPeakSet spectrum, FragmentMatchMap solution_map, FragmentBase frag,
+                               double error_tolerance, np.uint8_t* mask) except -1:
+    """Add every peak in `spectrum` matching `frag` which is not flagged in `mask` to
+    `solution_map`.
+
+    When `spectrum` is indexed, the matching peaks are located by binary search over its
+    neutral mass array and visited in place, instead of being copied into a new tuple by
+    :meth:`~.DeconvolutedPeakSet.all_peaks_for` for every fragment.
+    """
+    cdef:
+        DeconvolutedPeakSetIndexed indexed_spectrum
+        DeconvolutedPeak peak
+        tuple peaks
+        size_t start, end, i
+
+    indexed_spectrum = _as_indexed(spectrum)
+    if indexed_spectrum is not None:
+        if not _peak_interval(indexed_spectrum, frag.mass, error_tolerance, &start, &end):
+            return 0
+        for i in range(start, end):
+            # Peaks are stored in neutral mass order, so the position is the peak's index
+            if mask[i]:
+                continue
+            solution_map.add_peak_fragment(indexed_spectrum.getitem(i), frag)
+    else:
+        peaks = spectrum.all_peaks_for(frag.mass, error_tolerance)
+        for i in range(PyTuple_GET_SIZE(peaks)):
+            peak = <DeconvolutedPeak>PyTuple_GET_ITEM(peaks, i)
+            if mask[peak._index.neutral_mass]:
+                continue
+            solution_map.add_peak_fragment(peak, frag)
+    return 0
+
+
 @cython.binding(True)
 @cython.boundscheck(False)
 cpdef _compute_coverage_vectors(self):
@@ -200,14 +278,13 @@ def SimpleCoverageScorer_match_backbone_series(self, IonSeriesBase series, doubl
                                                set masked_peaks=None, strategy=None, bint include_neutral_losses=False):
     cdef:
         list frags, fragments
-        tuple peaks
         bint glycosylated_position, previous_position_glycosylated
         PeptideFragment frag
         FragmentMatchMap solution_map
         long glycosylated_term_ions_count
-        DeconvolutedPeak peak
         DeconvolutedPeakSet spectrum
-        size_t i, n, j, m, i_peaks, n_peaks
+        np.ndarray[np.uint8_t, ndim=1, mode="c"] mask
+        size_t i, n, j, m
 
     if strategy is None:
         strategy = HCDFragmentationStrategy
@@ -225,6 +302,7 @@ def SimpleCoverageScorer_match_backbone_series(self, IonSeriesBase series, doubl
         fragments = <list>obj
 
     solution_map = <FragmentMatchMap>self.solution_map
+    mask = _build_peak_mask(spectrum, masked_peaks)
 
     n = PyList_GET_SIZE(fragments)
     for i in range(n):
@@ -235,12 +313,7 @@ def SimpleCoverageScorer_match_backbone_series(self, IonSeriesBase series, doubl
             frag = <PeptideFragment>PyList_GET_ITEM(frags, j)
             if not glycosylated_position:
                 glycosylated_position |= frag._is_glycosylated()
-            peaks = <tuple>spectrum.all_peaks_for(frag.mass, error_tolerance)
-            for i_peaks in range(PyTuple_Size(peaks)):
-                peak = <DeconvolutedPeak>PyTuple_GetItem(peaks, i_peaks)
-                if peak._index.neutral_mass in masked_peaks:
-                    continue
-                solution_map.add(peak, frag)
+            _match_fragment_peaks(spectrum, solution_map, frag, error_tolerance, &mask[0])
         if glycosylated_position:
             glycosylated_term_ions_count += 1
         previous_position_glycosylated = glycosylated_position
@@ -259,15 +332,14 @@ def CoverageWeightedBinomialScorer_match_backbone_series(self, IonSeriesBase ser
                                                          bint include_neutral_losses=False):
     cdef:
         list frags, fragments
-        tuple peaks
         bint glycosylated_position, previous_position_glycosylated
         PeptideFragment frag
         FragmentMatchMap solution_map
         long glycosylated_term_ions_count
         long n_theoretical
-        DeconvolutedPeak peak
         DeconvolutedPeakSet spectrum
-        size_t i, n, j, m, i_peaks, n_peaks
+        np.ndarray[np.uint8_t, ndim=1, mode="c"] mask
+        size_t i, n, j, m
 
 
     if strategy is None:
@@ -285,6 +357,7 @@ def CoverageWeightedBinomialScorer_match_backbone_series(self, IonSeriesBase ser
         fragments = <list>obj
 
     solution_map = <FragmentMatchMap>self.solution_map
+    mask = _build_peak_mask(spectrum, masked_peaks)
 
     n = PyList_GET_SIZE(fragments)
     for i in range(n):
@@ -297,13 +370,7 @@ def CoverageWeightedBinomialScorer_match_backbone_series(self, IonSeriesBase ser
             frag = <PeptideFragment>PyList_GET_ITEM(frags, j)
             if not glycosylated_position:
                 glycosylated_position |= frag._is_glycosylated()
-            peaks = spectrum.all_peaks_for(frag.mass, error_tolerance)
-            n_peaks = PyTuple_Size(peaks)
-            for i_peaks in range(n_peaks):
-                peak = <DeconvolutedPeak>PyTuple_GetItem(peaks, i_peaks)
-                if peak._index.neutral_mass in masked_peaks:
-                    continue
-                solution_map.add(peak, frag)
+            _match_fragment_peaks(spectrum, solution_map, frag, error_tolerance, &mask[0])
         if glycosylated_position:
             glycosylated_term_ions_count += 1
         previous_position_glycosylated = glycosylated_position
@@ -357,8 +424,9 @@ def _match_stub_glycopeptides(self, double error_tolerance=2e-5, set masked_peak
         list fragments
         tuple peaks, shifted_peaks
         DeconvolutedPeak peak
-        size_t i, n, j, m, k
+        size_t i, n, j, m, k, start, end
         DeconvolutedPeakSet spectrum
+        DeconvolutedPeakSetIndexed indexed_spectrum
         FragmentMatchMap solution_map
 
 
@@ -373,20 +441,28 @@ def _match_stub_glycopeptides(self, double error_tolerance=2e-5, set masked_peak
 
     spectrum = <DeconvolutedPeakSet>self.spectrum
     solution_map = <FragmentMatchMap>self.solution_map
+    indexed_spectrum = _as_indexed(spectrum)
 
     for i in range(PyList_GET_SIZE(fragments)):
         frag = <FragmentBase>PyList_GET_ITEM(fragments, i)
 
-        peaks = spectrum.all_peaks_for(frag.mass, error_tolerance)
-        for j in range(PyTuple_Size(peaks)):
-            peak = <DeconvolutedPeak>PyTuple_GetItem(peaks, j)
-            # should we be masking these? peptides which have amino acids which are
-            # approximately the same mass as a monosaccharide unit at ther terminus
-            # can produce cases where a stub ion and a backbone fragment match the
-            # same peak.
-            #
-            masked_peaks.add(peak._index.neutral_mass)
-            solution_map.add(peak, frag)
+        # should we be masking these? peptides which have amino acids which are
+        # approximately the same mass as a monosaccharide unit at ther terminus
+        # can produce cases where a stub ion and a backbone fragment match the
+        # same peak.
+        #
+        if indexed_spectrum is not None:
+            if _peak_interval(indexed_spectrum, frag.mass, error_tolerance, &start, &end):
+                for j in range(start, end):
+                    peak = indexed_spectrum.getitem(j)
+                    masked_peaks.add(peak._index.neutral_mass)
+                    solution_map.add_peak_fragment(peak, frag)
+        else:
+            peaks = spectrum.all_peaks_for(frag.mass, error_tolerance)
+            for j in range(PyTuple_Size(peaks)):
+                peak = <DeconvolutedPeak>PyTuple_GetItem(peaks, j)
+                masked_peaks.add(peak._index.neutral_mass)
+                solution_map.add_peak_fragment(peak, frag)
         if chemical_shift is not None:
             shifted_mass = frag.mass + chemical_shift.mass
             shifted_peaks = spectrum.all_peaks_for(shifted_mass, error_tolerance)
@@ -440,6 +516,62 @@ cpdef DeconvolutedPeak base_peak_tuple(tuple peaks):
     return best_peak
 
 
+cdef DeconvolutedPeak _base_peak_in_interval(DeconvolutedPeakSetIndexed spectrum, double mass,
+                                              double error_tolerance, DeconvolutedPeak best_peak):
+    """Return the most intense of `best_peak` and the peaks within `error_tolerance` of `mass`,
+    preferring the earliest on ties like :func:`base_peak_tuple`.
+    """
+    cdef:
+        size_t start, end, i
+        DeconvolutedPeak peak
+    if not _peak_interval(spectrum, mass, error_tolerance, &start, &end):
+        return best_peak
+    for i in range(start, end):
+        peak = spectrum.getitem(i)
+        if best_peak is None or peak.intensity > best_peak.intensity:
+            best_peak = peak
+    return best_peak
+
+
+@cython.binding(True)
+def GlycanCompositionSignatureMatcher_match(self, double error_tolerance=2e-5, *args, **kwargs):
+    cdef:
+        DeconvolutedPeakSet spectrum
+        DeconvolutedPeakSetIndexed indexed_spectrum
+        DeconvolutedPeak peak
+        dict expected_matches, unexpected_matches
+        double mass
+        bint is_expected
+
+    spectrum = <DeconvolutedPeakSet>self.spectrum
+    if spectrum is None or spectrum.get_size() == 0:
+        return
+    self.maximum_intensity = self.base_peak()
+    indexed_spectrum = _as_indexed(spectrum)
+    glycan_composition = self.glycan_composition
+    expected_matches = self.expected_matches
+    unexpected_matches = self.unexpected_matches
+
+    for monosaccharide in self.signatures:
+        is_expected = glycan_composition._getitem_fast(monosaccharide) != 0
+        mass = monosaccharide.mass()
+        if indexed_spectrum is not None:
+            peak = _base_peak_in_interval(indexed_spectrum, mass, error_tolerance, None)
+            peak = _base_peak_in_interval(indexed_spectrum, mass + H2O_loss_mass, error_tolerance, peak)
+        else:
+            peak = base_peak_tuple(
+                spectrum.all_peaks_for(mass, error_tolerance) +
+                spectrum.all_peaks_for(mass + H2O_loss_mass, error_tolerance))
+        if peak is None:
+            if is_expected:
+                expected_matches[monosaccharide] = None
+            continue
+        if is_expected:
+            expected_matches[monosaccharide] = peak
+        else:
+            unexpected_matches[monosaccharide] = peak
+
+
 cdef double sqrt2pi = sqrt(2 * np.pi)
 
 
@@ -463,12 +595,11 @@ cpdef PeptideSpectrumMatcherBase_match_backbone_series(self, IonSeriesBase serie
                                                        set masked_peaks=None, strategy=None, bint include_neutral_losses=False):
     cdef:
         list frags, fragments
-        tuple peaks
         PeptideFragment frag
         FragmentMatchMap solution_map
-        DeconvolutedPeak peak
         DeconvolutedPeakSet spectrum
-        size_t i, n, j, m, i_peaks, n_peaks
+        np.ndarray[np.uint8_t, ndim=1, mode="c"] mask
+        size_t i, n, j, m
 
     if strategy is None:
         strategy = HCDFragmentationStrategy
@@ -481,6 +612,7 @@ cpdef PeptideSpectrumMatcherBase_match_backbone_series(self, IonSeriesBase serie
         fragments = <list>obj
 
     solution_map = <FragmentMatchMap>self.solution_map
+    mask = _build_peak_mask(spectrum, masked_peaks)
 
     n = PyList_GET_SIZE(fragments)
     for i in range(n):
@@ -488,13 +620,7 @@ cpdef PeptideSpectrumMatcherBase_match_backbone_series(self, IonSeriesBase serie
         m = PyList_GET_SIZE(frags)
         for j in range(m):
             frag = <PeptideFragment>PyList_GET_ITEM(frags, j)
-            peaks = <tuple>spectrum.all_peaks_for(frag.mass, error_tolerance)
-            n_peaks = PyTuple_GET_SIZE(peaks)
-            for i_peaks in range(n_peaks):
-                peak = <DeconvolutedPeak>PyTuple_GET_ITEM(peaks, i_peaks)
-                if PySet_Contains(masked_peaks, peak._index.neutral_mass):
-                    continue
-                solution_map.add(peak, frag)
+            _match_fragment_peaks(spectrum, solution_map, frag, error_tolerance, &mask[0])
 
 
 @cython.binding(True)
@@ -682,12 +808,15 @@ cpdef double fast_coarse_score(DeconvolutedPeakSet peak_set, _PeptideSequenceCor
         size_t i, n, j, m, k, l
         list fragments, frags
         double acc
+        size_t start, end
         object fragout
         PeptideFragment frag
         tuple peaks
         DeconvolutedPeak peak
+        DeconvolutedPeakSetIndexed indexed_peak_set
 
     acc = 0.0
+    indexed_peak_set = _as_indexed(peak_set)
     fragout = target.get_fragments("b")
     if isinstance(fragout, list):
         fragments = <list>fragout
@@ -699,6 +828,11 @@ cpdef double fast_coarse_score(DeconvolutedPeakSet peak_set, _PeptideSequenceCor
         m = PyList_GET_SIZE(frags)
         for j in range(m):
             frag = <PeptideFragment>PyList_GET_ITEM(frags, j)
+            if indexed_peak_set is not None:
+                if _peak_interval(indexed_peak_set, frag.mass, error_tolerance, &start, &end):
+                    for k in range(start, end):
+                        acc += log10(indexed_peak_set.getitem(k).intensity)
+                continue
             peaks = peak_set.all_peaks_for(frag.mass, error_tolerance)
             l = PyTuple_GET_SIZE(peaks)
             for k in range(l):
@@ -716,6 +850,11 @@ cpdef double fast_coarse_score(DeconvolutedPeakSet peak_set, _PeptideSequenceCor
         m = PyList_GET_SIZE(frags)
         for j in range(m):
             frag = <PeptideFragment>PyList_GET_ITEM(frags, j)
+            if indexed_peak_set is not None:
+                if _peak_interval(indexed_peak_set, frag.mass, error_tolerance, &start, &end):
+                    for k in range(start, end):
+                        acc += log10(indexed_peak_set.getitem(k).intensity)
+                continue
             peaks = peak_set.all_peaks_for(frag.mass, error_tolerance)
             l = PyTuple_GET_SIZE(peaks)
             for k in range(l):
@@ -1,7 +1,5 @@
 cimport cython
 
-from cpython.list cimport PyList_GetItem
-
 cimport numpy as np
 import numpy as np
 np.import_array()
@@ -46,13 +44,65 @@ cdef class NearestValueLookUp(object):
         the maximum key's value.
     '''
     cdef:
-        public list items
+        list _items
+        np.ndarray _scores
+        np.ndarray _values
+        double* _score_data
 
     def __init__(self, items):
         if isinstance(items, dict):
             items = items.items()
         self.items = self._transform_items(items)
 
+    @classmethod
+    def from_sorted(cls, scores, values):
+        """Build a lookup from parallel arrays of keys and values, where `scores`
+        is already sorted in increasing order and contains no NaN.
+
+        Parameters
+        ----------
+        scores : :class:`np.ndarray`
+            The sorted keys
+        values : :class:`np.ndarray`
+            The value for each key
+
+        Returns
+        -------
+        NearestValueLookUp
+        """
+        cdef:
+            NearestValueLookUp self
+            np.ndarray[double, ndim=1, mode='c'] score_array, value_array
+            list items
+            ScoreCell cell
+            Py_ssize_t i, n
+        self = cls.__new__(cls)
+        score_array = np.ascontiguousarray(scores, dtype=np.float64)
+        value_array = np.ascontiguousarray(values, dtype=np.float64)
+        n = score_array.shape[0]
+        items = []
+        for i in range(n):
+            cell = ScoreCell.__new__(ScoreCell)
+            cell.score = score_array[i]
+            cell.value = value_array[i]
+            items.append(cell)
+        self._items = items
+        self._scores = score_array
+        self._values = value_array
+        self._score_data = <double*>np.PyArray_DATA(score_array)
+        return self
+
+    @property
+    def items(self):
+        return self._items
+
+    @items.setter
+    def items(self, list items):
+        self._items = items
+        self._scores = np.array([cell.score for cell in items], dtype=np.float64)
+        self._values = np.array([cell.value for cell in items], dtype=np.float64)
+        self._score_data = <double*>np.PyArray_DATA(self._scores)
+
     def _transform_items(self, items):
         return sorted([ScoreCell(*x) for x in items if not np.isnan(x[0])], key=lambda x: x[0])
 
@@ -72,23 +122,20 @@ cdef class NearestValueLookUp(object):
     cpdef max_key(self):
         cdef:
             Py_ssize_t n
-            ScoreCell cell
-        n = len(self.items)
+        n = len(self._items)
         if n == 0:
             return 0
-        cell = <ScoreCell>PyList_GetItem(self.items, n - 1)
-        return cell.score
+        return self._score_data[n - 1]
 
     cpdef Py_ssize_t _find_closest_item(self, double value):
         cdef:
-            list array
+            double* array
             Py_ssize_t lo, hi, n, i, mid, best_index
-            ScoreCell xc
             double error_tolerance, err, best_error, x
 
-        array = self.items
+        array = self._score_data
         lo = 0
-        hi = len(array)
+        hi = len(self._items)
         n = hi
 
         error_tolerance = 1e-3
@@ -101,8 +148,7 @@ cdef class NearestValueLookUp(object):
 
         while hi - lo:
             i = (hi + lo) // 2
-            xc = <ScoreCell>PyList_GetItem(array, i)
-            x = xc.score
+            x = array[i]
             err = x - value
             if abs(err) < error_tolerance:
                 mid = i
@@ -110,8 +156,7 @@ cdef class NearestValueLookUp(object):
                 best_error = abs(err)
                 i = mid - 1
                 while i >= 0:
-                    xc = <ScoreCell>PyList_GetItem(array, i)
-                    x = xc.score
+                    x = array[i]
                     err = abs(x - value)
                     if err < best_error:
                         best_error = err
@@ -121,8 +166,7 @@ cdef class NearestValueLookUp(object):
                     i -= 1
                 i = mid + 1
                 while i < n:
-                    xc = <ScoreCell>PyList_GetItem(array, i)
-                    x = xc.score
+                    x = array[i]
                     err = abs(x - value)
                     if err < best_error:
                         best_error = err
@@ -137,8 +181,7 @@ cdef class NearestValueLookUp(object):
                 best_error = abs(err)
                 i = mid - 1
                 while i >= 0:
-                    xc = <ScoreCell>PyList_GetItem(array, i)
-                    x = xc.score
+                    x = array[i]
                     err = abs(x - value)
                     if err < best_error:
                         best_error = err
@@ -148,8 +191,7 @@ cdef class NearestValueLookUp(object):
                     i -= 1
                 i = mid + 1
                 while i < n:
-                    xc = <ScoreCell>PyList_GetItem(array, i)
-                    x = xc.score
+                    x = array[i]
                     err = abs(x - value)
                     if err < best_error:
                         best_error = err
@@ -177,16 +219,46 @@ cdef class NearestValueLookUp(object):
         return self._get_one(key)
 
     def _get_sequence(self, key):
-        value = [self._get_one(k) for k in key]
-        if isinstance(key, np.ndarray):
-            value = np.array(value, dtype=float)
+        """Look up the values nearest to each of the keys in `key`
+        in a single vectorized search.
+
+        Parameters
+        ----------
+        key : :class:`~.Iterable` of :class:`float`
+            The keys to look up
+
+        Returns
+        -------
+        list or :class:`np.ndarray`
+            A :class:`np.ndarray` if `key` was one, otherwise a :class:`list`
+        """
+        n = len(self.items)
+        if n == 0:
+            raise IndexError(0)
+        keys = np.asarray(key, dtype=float)
+        scores = self._scores
+        values = self._values
+        if n == 1:
+            indices = np.zeros(keys.shape, dtype=np.intp)
+        else:
+            indices = np.clip(np.searchsorted(scores, keys), 1, n - 1)
+            # Step back to the lower neighbor when it is at least as close
+            indices -= (keys - scores[indices - 1]) <= (scores[indices] - keys)
+            indices[np.isnan(keys)] = 0
+        value = values[indices]
+        if not isinstance(key, np.ndarray):
+            value = value.tolist()
         return value
 
     cpdef _get_one(self, double key):
+        cdef:
+            Py_ssize_t ix, n
+            ScoreCell pair
+        n = len(self._items)
         ix = self._find_closest_item(key)
-        if ix >= len(self):
-            ix = len(self) - 1
+        if ix >= n:
+            ix = n - 1
         if ix < 0:
             ix = 0
-        pair = self.items[ix]
+        pair = <ScoreCell>self._items[ix]
         return pair.value
\ No newline at end of file
@@ -14,6 +14,8 @@ from glypy import Composition
 from glypy.composition import formula
 from glypy.structure.glycan_composition import FrozenGlycanComposition
 
+from sqlalchemy import select
+
 from glycan_profiling.serialize import DatabaseBoundOperation, func
 from glycan_profiling.serialize.hypothesis import GlycopeptideHypothesis
 from glycan_profiling.serialize.hypothesis.peptide import Glycopeptide, Peptide, Protein
@@ -27,7 +29,7 @@ from glycan_profiling.database.builder.glycan import glycan_combinator
 from glycan_profiling.database.builder.base import HypothesisSerializerBase
 
 from glycopeptidepy.structure.sequence import (
-    _n_glycosylation, _o_glycosylation, _gag_linker_glycosylation)
+    parse as parse_sequence, _n_glycosylation, _o_glycosylation, _gag_linker_glycosylation)
 
 
 _DEFAULT_GLYCAN_STEP_LIMIT = 15000
@@ -37,6 +39,18 @@ def slurp(session, model, ids, flatten=True):
     if flatten:
         ids = [j for i in ids for j in i]
     total = len(ids)
+    if total == 0:
+        return []
+    lo = min(ids)
+    hi = max(ids)
+    # When the requested ids are nearly contiguous, a single range scan over the primary key
+    # is much cheaper than many round trips, even after discarding the extra rows.
+    if (hi - lo) <= total * 10:
+        wanted = frozenset(ids)
+        return [
+            row for row in session.query(model).filter(model.id.between(lo, hi))
+            if row.id in wanted
+        ]
     last = 0
     step = 100
     results = []
@@ -47,6 +61,98 @@ def slurp(session, model, ids, flatten=True):
     return results
 
 
+class PeptideRecord(object):
+    """A lightweight, unmapped stand-in for :class:`~.Peptide` carrying only the
+    columns :meth:`PeptideGlycosylator.handle_peptide` reads.
+    """
+    __slots__ = [
+        'id', 'calculated_mass', 'formula', 'modified_peptide_sequence', 'protein_id',
+        'hypothesis_id', 'n_glycosylation_sites', 'o_glycosylation_sites', 'gagylation_sites']
+
+    def __init__(self, id, calculated_mass, formula, modified_peptide_sequence, protein_id,
+                 hypothesis_id, n_glycosylation_sites, o_glycosylation_sites, gagylation_sites):
+        self.id = id
+        self.calculated_mass = calculated_mass
+        self.formula = formula
+        self.modified_peptide_sequence = modified_peptide_sequence
+        self.protein_id = protein_id
+        self.hypothesis_id = hypothesis_id
+        self.n_glycosylation_sites = n_glycosylation_sites
+        self.o_glycosylation_sites = o_glycosylation_sites
+        self.gagylation_sites = gagylation_sites
+
+    def convert(self):
+        inst = parse_sequence(self.modified_peptide_sequence)
+        inst.id = self.id
+        return inst
+
+    def __repr__(self):
+        return "PeptideRecord(%d, %s)" % (self.id, self.modified_peptide_sequence)
+
+
+def iter_peptide_records(connection, ids, step=500):
+    """Stream :class:`PeptideRecord` instances for `ids` through Core SELECTs, skipping
+    the ORM's identity map and attribute instrumentation.
+
+    Rows are fetched `step` at a time, through a server-side cursor where the
+    database driver supports one, so only one block of rows is resident at once.
+    Because the result stays open while it is consumed, `connection` should not be
+    one that is committed to in the meantime.
+
+    Parameters
+    ----------
+    connection : :class:`~.Connection`
+        The connection to execute the queries through
+    ids : list of int
+        The ids of the :class:`~.Peptide` rows to load
+    step : int, optional
+        The number of rows to fetch at a time
+
+    Yields
+    ------
+    :class:`PeptideRecord`
+    """
+    total = len(ids)
+    if total == 0:
+        return
+    table = Peptide.__table__
+    columns = [table.c[name] for name in PeptideRecord.__slots__]
+    # SQLite's cursors are already lazy and it has no server-side cursors to request
+    stream = connection.dialect.name != "sqlite"
+    lo = min(ids)
+    hi = max(ids)
+    if (hi - lo) <= total * 10:
+        wanted = frozenset(ids)
+        statements = [select(columns).where(table.c.id.between(lo, hi))]
+    else:
+        wanted = None
+        statements = [
+            select(columns).where(table.c.id.in_(ids[i:i + 100]))
+            for i in range(0, total, 100)
+        ]
+    for statement in statements:
+        if stream:
+            statement = statement.execution_options(stream_results=True)
+        result = connection.execute(statement)
+        while True:
+            rows = result.fetchmany(step)
+            if not rows:
+                break
+            for row in rows:
+                if wanted is None or row[0] in wanted:
+                    yield PeptideRecord(*row)
+
+
+def slurp_peptide_records(session, ids):
+    """Load :class:`PeptideRecord` instances for `ids`.
+
+    See Also
+    --------
+    :func:`iter_peptide_records`
+    """
+    return list(iter_peptide_records(session.connection(), ids))
+
+
 class GlycopeptideHypothesisSerializerBase(DatabaseBoundOperation, HypothesisSerializerBase):
     """Common machinery for Glycopeptide Hypothesis construction.
 
@@ -127,28 +233,24 @@ class GlycopeptideHypothesisDestroyer(DatabaseBoundOperation, TaskBase):
         self.session.query(Glycopeptide).filter(
             Glycopeptide.hypothesis_id == self.hypothesis_id).delete(
             synchronize_session=False)
-        self.session.commit()
 
     def delete_peptides(self):
         self.log("Delete Peptides")
-        q = self.session.query(Protein.id).filter(Protein.hypothesis_id == self.hypothesis_id)
-        for protein_id, in q:
-            self.session.query(Peptide).filter(
-                Peptide.protein_id == protein_id).delete(
-                synchronize_session=False)
-            self.session.commit()
+        protein_ids = select([Protein.__table__.c.id]).where(
+            Protein.__table__.c.hypothesis_id == self.hypothesis_id)
+        peptide_table = Peptide.__table__
+        self.session.execute(
+            peptide_table.delete().where(peptide_table.c.protein_id.in_(protein_ids)))
 
     def delete_protein(self):
         self.log("Delete Protein")
         self.session.query(Protein).filter(Protein.hypothesis_id == self.hypothesis_id).delete(
             synchronize_session=False)
-        self.session.commit()
 
     def delete_hypothesis(self):
         self.log("Delete Hypothesis")
         self.session.query(GlycopeptideHypothesis).filter(
             GlycopeptideHypothesis.id == self.hypothesis_id).delete()
-        self.session.commit()
 
     def run(self):
         self.delete_glycopeptides()
@@ -235,10 +337,92 @@ def limiting_combinations(iterable, n, limit=100):
             break
 
 
+def enumerate_glycoforms(peptide, reference, peptide_composition, glycan_combinations,
+                         unoccupied_sites, size, modification_name, water_mass):
+    """Generate the glycopeptide records for every placement of each glycan combination
+    of `size` glycans on `size` of the `unoccupied_sites` of `peptide`.
+
+    Parameters
+    ----------
+    peptide : :class:`~.Peptide`
+        The peptide record being glycosylated
+    reference : :class:`~.PeptideSequence`
+        The parsed peptide sequence to clone for each glycoform
+    peptide_composition : :class:`~.Composition`
+        The elemental composition of the peptide
+    glycan_combinations : list of :class:`GlycanCombinationRecord`
+        The glycan combinations to place
+    unoccupied_sites : :class:`~.Iterable` of :class:`int`
+        The glycosylation sites not already occupied in `reference`
+    size : int
+        The number of glycans in each of `glycan_combinations`
+    modification_name : str
+        The name of the glycosylation modification to place at each site
+    water_mass : float
+        The mass of a water molecule, lost per glycosidic bond
+
+    Yields
+    ------
+    dict
+    """
+    if not glycan_combinations:
+        return
+    # The glycosylated sequence for each placement does not depend upon which glycan
+    # combination is attached, so format each one once and append each glycan to it.
+    site_sequences = []
+    for site_set in limiting_combinations(unoccupied_sites, size):
+        sequence = reference.clone()
+        for site in site_set:
+            sequence.add_modification(site, modification_name)
+        site_sequences.append(sequence.get_sequence(include_glycan=False))
+
+    for gc in glycan_combinations:
+        total_mass = peptide.calculated_mass + gc.calculated_mass - (gc.count * water_mass)
+        formula_string = formula(peptide_composition + gc.dehydrated_composition())
+        glycan_string = str(gc.convert())
+
+        for sequence_string in site_sequences:
+            glycopeptide_sequence = sequence_string + glycan_string
+
+            glycopeptide = dict(
+                calculated_mass=total_mass,
+                formula=formula_string,
+                glycopeptide_sequence=glycopeptide_sequence,
+                peptide_id=peptide.id,
+                protein_id=peptide.protein_id,
+                hypothesis_id=peptide.hypothesis_id,
+                glycan_combination_id=gc.id)
+            yield glycopeptide
+
+
+try:
+    from glycan_profiling._c.database.glycopeptide_enum import enumerate_glycoforms
+except ImportError:
+    pass
+
+
+def unoccupied_sites(sequence, sites):
+    """Select the positions in `sites` which do not already carry a modification
+    in `sequence`, in ascending order.
+
+    Parameters
+    ----------
+    sequence : :class:`~.PeptideSequence`
+        The parsed peptide sequence
+    sites : :class:`~.Iterable` of :class:`int`
+        The candidate glycosylation sites
+
+    Returns
+    -------
+    tuple of int
+    """
+    return tuple(site for site in sorted(set(sites)) if not sequence[site][1])
+
+
 class GlycanCombinationRecord(object):
     __slots__ = [
         'id', 'calculated_mass', 'formula', 'count', 'glycan_composition_string',
-        '_composition', '_dehydrated_composition']
+        '_composition', '_dehydrated_composition', '_glycan']
 
     def __init__(self, combination):
         self.id = combination.id
@@ -248,6 +432,7 @@ class GlycanCombinationRecord(object):
         self.glycan_composition_string = combination.composition
         self._composition = None
         self._dehydrated_composition = None
+        self._glycan = None
 
     def total_composition(self):
         if self._composition is None:
@@ -260,18 +445,49 @@ class GlycanCombinationRecord(object):
         return self._dehydrated_composition
 
     def convert(self):
-        gc = FrozenGlycanComposition.parse(self.glycan_composition_string)
-        gc.id = self.id
-        gc.count = self.count
-        return gc
+        if self._glycan is None:
+            gc = FrozenGlycanComposition.parse(self.glycan_composition_string)
+            gc.id = self.id
+            gc.count = self.count
+            self._glycan = gc
+        return self._glycan
 
     def __repr__(self):
         return "GlycanCombinationRecord(%d, %s)" % (
             self.id, self.glycan_composition_string)
 
 
+def load_glycan_combination_records(session, hypothesis_id, glycan_offset=None,
+                                    glycan_limit=_DEFAULT_GLYCAN_STEP_LIMIT):
+    """Load the :class:`GlycanCombination` rows of a hypothesis as detached
+    :class:`GlycanCombinationRecord` objects.
+
+    Parameters
+    ----------
+    session : :class:`~.Session`
+        The session to query with
+    hypothesis_id : int
+        The id of the glycopeptide hypothesis
+    glycan_offset : int, optional
+        If given, load only the `glycan_limit` combinations starting from this
+        offset
+    glycan_limit : int, optional
+        The number of combinations to load when `glycan_offset` is given
+
+    Returns
+    -------
+    list of :class:`GlycanCombinationRecord`
+    """
+    query = session.query(GlycanCombination).filter(
+        GlycanCombination.hypothesis_id == hypothesis_id)
+    if glycan_offset is not None:
+        query = query.offset(glycan_offset).limit(glycan_limit)
+    return [GlycanCombinationRecord(gc) for gc in query]
+
+
 class PeptideGlycosylator(object):
-    def __init__(self, session, hypothesis_id, glycan_offset=None, glycan_limit=_DEFAULT_GLYCAN_STEP_LIMIT):
+    def __init__(self, session, hypothesis_id, glycan_offset=None, glycan_limit=_DEFAULT_GLYCAN_STEP_LIMIT,
+                 glycan_combinations=None):
         self.session = session
 
         self.glycan_offset = glycan_offset
@@ -281,7 +497,7 @@ class PeptideGlycosylator(object):
         self.hypothesis = self.session.query(GlycopeptideHypothesis).get(hypothesis_id)
         self.total_combinations = self._get_total_combination_count()
 
-        self.build_glycan_table(self.glycan_offset)
+        self.build_glycan_table(self.glycan_offset, glycan_combinations)
 
     def _get_total_combination_count(self):
         count = self.session.query(
@@ -290,133 +506,86 @@ class PeptideGlycosylator(object):
         return count
 
     def _load_glycan_records(self):
-        if self.glycan_offset is None:
-            glycan_combinations = self.session.query(
-                GlycanCombination).filter(
-                GlycanCombination.hypothesis_id == self.hypothesis_id).all()
-            glycan_combinations = [GlycanCombinationRecord(gc) for gc in glycan_combinations]
-        else:
-            glycan_combinations = self.session.query(
-                GlycanCombination).filter(
-                GlycanCombination.hypothesis_id == self.hypothesis_id).offset(
-                self.glycan_offset).limit(self.glycan_limit).all()
-        return glycan_combinations
+        return load_glycan_combination_records(
+            self.session, self.hypothesis_id, self.glycan_offset, self.glycan_limit)
 
     def _build_size_table(self, glycan_combinations):
         self.glycan_combination_partitions = GlycanCombinationPartitionTable(
             self.session, glycan_combinations, distinct_glycan_classes(
                 self.session, self.hypothesis_id), self.hypothesis)
 
-    def build_glycan_table(self, offset=None):
+    def build_glycan_table(self, offset=None, glycan_combinations=None):
         self.glycan_offset = offset
-        glycan_combinations = self._load_glycan_records()
+        if glycan_combinations is None:
+            glycan_combinations = self._load_glycan_records()
         self._build_size_table(glycan_combinations)
 
     def handle_peptide(self, peptide):
-        water = Composition("H2O")
+        water_mass = Composition("H2O").mass
         peptide_composition = Composition(str(peptide.formula))
-        obj = peptide.convert()
-        reference = obj.clone()
+        # `reference` is never modified, only cloned per glycoform
+        reference = peptide.convert()
 
         # Handle N-linked glycosylation sites
 
-        n_glycosylation_unoccupied_sites = set(peptide.n_glycosylation_sites)
-        for site in list(n_glycosylation_unoccupied_sites):
-            if obj[site][1]:
-                n_glycosylation_unoccupied_sites.remove(site)
+        n_glycosylation_unoccupied_sites = unoccupied_sites(reference, peptide.n_glycosylation_sites)
         for i in range(len(n_glycosylation_unoccupied_sites)):
             i += 1
-            for gc in self.glycan_combination_partitions[i, {GlycanTypes.n_glycan: i}]:
-                total_mass = peptide.calculated_mass + gc.calculated_mass - (gc.count * water.mass)
-                formula_string = formula(peptide_composition + gc.dehydrated_composition())
-
-                for site_set in limiting_combinations(n_glycosylation_unoccupied_sites, i):
-                    sequence = reference.clone()
-                    for site in site_set:
-                        sequence.add_modification(site, _n_glycosylation.name)
-                    sequence.glycan = gc.convert()
-
-                    glycopeptide_sequence = str(sequence)
-
-                    glycopeptide = dict(
-                        calculated_mass=total_mass,
-                        formula=formula_string,
-                        glycopeptide_sequence=glycopeptide_sequence,
-                        peptide_id=peptide.id,
-                        protein_id=peptide.protein_id,
-                        hypothesis_id=peptide.hypothesis_id,
-                        glycan_combination_id=gc.id)
-                    yield glycopeptide
+            for glycopeptide in enumerate_glycoforms(
+                    peptide, reference, peptide_composition,
+                    self.glycan_combination_partitions[i, {GlycanTypes.n_glycan: i}],
+                    n_glycosylation_unoccupied_sites, i, _n_glycosylation.name, water_mass):
+                yield glycopeptide
 
         # Handle O-linked glycosylation sites
-        o_glycosylation_unoccupied_sites = set(peptide.o_glycosylation_sites)
-        for site in list(o_glycosylation_unoccupied_sites):
-            if obj[site][1]:
-                o_glycosylation_unoccupied_sites.remove(site)
+        o_glycosylation_unoccupied_sites = unoccupied_sites(reference, peptide.o_glycosylation_sites)
 
         for i in range(len(o_glycosylation_unoccupied_sites)):
             i += 1
-            for gc in self.glycan_combination_partitions[i, {GlycanTypes.o_glycan: i}]:
-                total_mass = peptide.calculated_mass + gc.calculated_mass - (gc.count * water.mass)
-                formula_string = formula(peptide_composition + gc.dehydrated_composition())
-
-                for site_set in limiting_combinations(o_glycosylation_unoccupied_sites, i):
-                    sequence = reference.clone()
-                    for site in site_set:
-                        sequence.add_modification(site, _o_glycosylation.name)
-                    sequence.glycan = gc.convert()
-
-                    glycopeptide_sequence = str(sequence)
-
-                    glycopeptide = dict(
-                        calculated_mass=total_mass,
-                        formula=formula_string,
-                        glycopeptide_sequence=glycopeptide_sequence,
-                        peptide_id=peptide.id,
-                        protein_id=peptide.protein_id,
-                        hypothesis_id=peptide.hypothesis_id,
-                        glycan_combination_id=gc.id)
-                    yield glycopeptide
+            for glycopeptide in enumerate_glycoforms(
+                    peptide, reference, peptide_composition,
+                    self.glycan_combination_partitions[i, {GlycanTypes.o_glycan: i}],
+                    o_glycosylation_unoccupied_sites, i, _o_glycosylation.name, water_mass):
+                yield glycopeptide
 
         # Handle GAG glycosylation sites
-        gag_unoccupied_sites = set(peptide.gagylation_sites)
-        for site in list(gag_unoccupied_sites):
-            if obj[site][1]:
-                gag_unoccupied_sites.remove(site)
+        gag_unoccupied_sites = unoccupied_sites(reference, peptide.gagylation_sites)
         for i in range(len(gag_unoccupied_sites)):
             i += 1
-            for gc in self.glycan_combination_partitions[i, {GlycanTypes.gag_linker: i}]:
-                total_mass = peptide.calculated_mass + gc.calculated_mass - (gc.count * water.mass)
-                formula_string = formula(peptide_composition + gc.dehydrated_composition())
-                for site_set in limiting_combinations(gag_unoccupied_sites, i):
-                    sequence = reference.clone()
-                    for site in site_set:
-                        sequence.add_modification(site, _gag_linker_glycosylation.name)
-                    sequence.glycan = gc.convert()
-
-                    glycopeptide_sequence = str(sequence)
-
-                    glycopeptide = dict(
-                        calculated_mass=total_mass,
-                        formula=formula_string,
-                        glycopeptide_sequence=glycopeptide_sequence,
-                        peptide_id=peptide.id,
-                        protein_id=peptide.protein_id,
-                        hypothesis_id=peptide.hypothesis_id,
-                        glycan_combination_id=gc.id)
-                    yield glycopeptide
+            for glycopeptide in enumerate_glycoforms(
+                    peptide, reference, peptide_composition,
+                    self.glycan_combination_partitions[i, {GlycanTypes.gag_linker: i}],
+                    gag_unoccupied_sites, i, _gag_linker_glycosylation.name, water_mass):
+                yield glycopeptide
 
 
 def null_log_handler(msg):
     print(msg)
 
 
+def insert_glycopeptide_batch(session, batch):
+    """Write a batch of glycopeptide records produced by
+    :meth:`PeptideGlycosylator.handle_peptide` using a single Core
+    ``executemany`` INSERT, bypassing the ORM's bulk mapping machinery.
+
+    Parameters
+    ----------
+    session : :class:`~.Session`
+        The session to execute the statement through
+    batch : list of dict
+        The glycopeptide records to write
+    """
+    if not batch:
+        return
+    session.execute(Glycopeptide.__table__.insert(), batch)
+
+
 class PeptideGlycosylatingProcess(Process):
     process_name = "glycopeptide-build-worker"
 
     def __init__(self, connection, hypothesis_id, input_queue, chunk_size=5000, done_event=None,
                  log_handler=null_log_handler, glycan_offset=None,
-                 glycan_limit=_DEFAULT_GLYCAN_STEP_LIMIT):
+                 glycan_limit=_DEFAULT_GLYCAN_STEP_LIMIT, glycan_combinations=None):
         Process.__init__(self)
         self.daemon = True
         self.connection = connection
@@ -428,57 +597,71 @@ class PeptideGlycosylatingProcess(Process):
 
         self.glycan_offset = glycan_offset
         self.glycan_limit = glycan_limit
+        # Pre-loaded glycan combinations shared by the parent process, loaded by
+        # the worker itself if not provided.
+        self.glycan_combinations = glycan_combinations
 
         self.session = None
+        self.reader = None
         self.work_done_event = Event()
 
     def is_work_done(self):
         return self.work_done_event.is_set()
 
     def process_result(self, collection):
-        self.session.bulk_insert_mappings(Glycopeptide, collection, render_nulls=True)
+        insert_glycopeptide_batch(self.session, collection)
         self.session.commit()
 
     def load_peptides(self, work_items):
-        peptides = slurp(self.session, Peptide, work_items, flatten=False)
+        # Buffer the chunk so the SELECT is finished before the session commits. An
+        # open result holds SQLite's read lock, which blocks that commit when the
+        # database uses a rollback journal (NOWAL=1) until the lock times out.
+        peptides = list(iter_peptide_records(self.reader, work_items))
         return peptides
 
     def task(self):
         database = DatabaseBoundOperation(self.connection)
         self.session = database.session
+        # Peptides are read over a separate connection from the session that
+        # commits each batch of glycopeptides.
+        self.reader = database.engine.connect()
         has_work = True
 
         glycosylator = PeptideGlycosylator(
             database.session, self.hypothesis_id,
             glycan_offset=self.glycan_offset,
-            glycan_limit=self.glycan_limit)
+            glycan_limit=self.glycan_limit,
+            glycan_combinations=self.glycan_combinations)
         result_accumulator = []
 
         n = 0
         n_gps = 0
-        while has_work:
-            try:
-                work_items = self.input_queue.get(timeout=5)
-                if work_items is None:
-                    has_work = False
+        try:
+            while has_work:
+                try:
+                    work_items = self.input_queue.get(timeout=5)
+                    if work_items is None:
+                        has_work = False
+                        continue
+                except Exception:
+                    if self.done_event.is_set():
+                        has_work = False
                     continue
-            except Exception:
-                if self.done_event.is_set():
-                    has_work = False
-                continue
-            peptides = self.load_peptides(work_items)
-            n += len(peptides)
-            for peptide in peptides:
-                for gp in glycosylator.handle_peptide(peptide):
-                    result_accumulator.append(gp)
-                    if len(result_accumulator) > self.chunk_size:
-                        n_gps += len(result_accumulator)
-                        self.process_result(result_accumulator)
-                        result_accumulator = []
-            if len(result_accumulator) > 0:
-                n_gps += len(result_accumulator)
-                self.process_result(result_accumulator)
-                result_accumulator = []
+                peptides = self.load_peptides(work_items)
+                for peptide in peptides:
+                    n += 1
+                    for gp in glycosylator.handle_peptide(peptide):
+                        result_accumulator.append(gp)
+                        if len(result_accumulator) > self.chunk_size:
+                            n_gps += len(result_accumulator)
+                            self.process_result(result_accumulator)
+                            result_accumulator = []
+                if len(result_accumulator) > 0:
+                    n_gps += len(result_accumulator)
+                    self.process_result(result_accumulator)
+                    result_accumulator = []
+        finally:
+            self.reader.close()
         self.work_done_event.set()
         # It seems there is no public API to force the process to check if it is done
         # but the internal method is invoked when creating a Process `repr` on Python 2.
@@ -507,14 +690,18 @@ class NonSavingPeptideGlycosylatingProcess(PeptideGlycosylatingProcess):
 class QueuePushingPeptideGlycosylatingProcess(PeptideGlycosylatingProcess):
     def __init__(self, connection, hypothesis_id, input_queue, output_queue, chunk_size=5000,
                  done_event=None, log_handler=null_log_handler, database_mutex=None,
-                 glycan_offset=None, glycan_limit=_DEFAULT_GLYCAN_STEP_LIMIT):
+                 glycan_offset=None, glycan_limit=_DEFAULT_GLYCAN_STEP_LIMIT,
+                 glycan_combinations=None):
         super(QueuePushingPeptideGlycosylatingProcess, self).__init__(
             connection, hypothesis_id, input_queue, chunk_size, done_event, log_handler,
-            glycan_offset=glycan_offset, glycan_limit=glycan_limit)
+            glycan_offset=glycan_offset, glycan_limit=glycan_limit,
+            glycan_combinations=glycan_combinations)
         self.output_queue = output_queue
         self.database_mutex = database_mutex
 
     def load_peptides(self, work_items):
+        # The rows are fully consumed while holding the lock, the writer may not
+        # interleave with an open read on SQLite.
         with self.database_mutex:
             result = super(QueuePushingPeptideGlycosylatingProcess, self).load_peptides(work_items)
         return result
@@ -532,6 +719,7 @@ class MultipleProcessPeptideGlycosylator(TaskBase):
         self.hypothesis_id = hypothesis_id
         self.glycan_combination_count = glycan_combination_count
         self.current_glycan_offset = 0
+        self.current_glycan_combinations = None
         self.glycan_limit = glycan_limit
 
         self.input_queue = Queue(10)
@@ -547,7 +735,8 @@ class MultipleProcessPeptideGlycosylator(TaskBase):
             self.output_queue, self.chunk_size, self.dealt_done_event,
             self.ipc_controller.sender(), self.database_mutex,
             glycan_offset=self.current_glycan_offset,
-            glycan_limit=self.glycan_limit)
+            glycan_limit=self.glycan_limit,
+            glycan_combinations=self.current_glycan_combinations)
         return worker
 
     def push_work_batches(self, peptide_ids):
@@ -597,6 +786,9 @@ class MultipleProcessPeptideGlycosylator(TaskBase):
                 self.current_glycan_offset, min(self.current_glycan_offset + self.glycan_limit,
                                                 self.glycan_combination_count),
                 _current_percent_complete))
+            # Load this block of glycan combinations once here rather than once per worker
+            self.current_glycan_combinations = load_glycan_combination_records(
+                session, self.hypothesis_id, self.current_glycan_offset, self.glycan_limit)
             queue_feeder = self.create_queue_feeder_thread(peptide_ids)
             self.spawn_all_workers()
 
@@ -622,7 +814,7 @@ class MultipleProcessPeptideGlycosylator(TaskBase):
                                     # to disk and then try to drain the queue again
                                     i += len(batch)
                                     try:
-                                        session.bulk_insert_mappings(Glycopeptide, batch, render_nulls=True)
+                                        insert_glycopeptide_batch(session, batch)
                                         session.commit()
                                     except Exception:
                                         session.rollback()
@@ -641,7 +833,7 @@ class MultipleProcessPeptideGlycosylator(TaskBase):
                     i += len(batch)
 
                     try:
-                        session.bulk_insert_mappings(Glycopeptide, batch, render_nulls=True)
+                        insert_glycopeptide_batch(session, batch)
                         session.commit()
                     except Exception:
                         session.rollback()
@@ -665,6 +857,7 @@ class MultipleProcessPeptideGlycosylator(TaskBase):
                     self.log("Failed to join %r" % worker.pid)
 
             self.current_glycan_offset += self.glycan_limit
+            self.current_glycan_combinations = None
 
         self.log("All Work Done. Rebuilding Indices")
         index_controller.create()
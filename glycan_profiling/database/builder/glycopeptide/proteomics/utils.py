@@ -2,6 +2,18 @@ def slurp(session, model, ids, flatten=True):
     if flatten:
         ids = [j for i in ids for j in i]
     total = len(ids)
+    if total == 0:
+        return []
+    lo = min(ids)
+    hi = max(ids)
+    # When the requested ids are nearly contiguous, a single range scan over the primary key
+    # is much cheaper than many round trips, even after discarding the extra rows.
+    if (hi - lo) <= total * 10:
+        wanted = frozenset(ids)
+        return [
+            row for row in session.query(model).filter(model.id.between(lo, hi))
+            if row.id in wanted
+        ]
     last = 0
     step = 100
     results = []
@@ -1,9 +1,12 @@
 import logging
 import operator
 
+from bisect import bisect_left
+
+import numpy as np
+
 from ms_deisotope.peak_dependency_network.intervals import SpanningMixin
 
-from glycan_profiling.structure.lru import LRUCache
 from glycan_profiling.database.mass_collection import ConcatenatedDatabase
 
 
@@ -90,11 +93,22 @@ class IntervalSet(object):
             intervals = list()
         self.intervals = sorted(intervals, key=lambda x: x.center)
         self._total_count = None
+        self._centers = None
         self.compute_total_count()
 
     def _invalidate(self):
         self._total_count = None
 
+    def _get_centers(self):
+        # A plain list of floats lets :func:`bisect.bisect_left` do the search in C
+        # instead of reading :attr:`center` from an interval at every step.
+        # The list is kept in step with :attr:`intervals` by the mutating methods and only
+        # rebuilt when an interval's center moves.
+        centers = self._centers
+        if centers is None:
+            centers = self._centers = [x.center for x in self.intervals]
+        return centers
+
     @property
     def total_count(self):
         if self._total_count is None:
@@ -123,27 +137,21 @@ class IntervalSet(object):
         return p.pretty(self.intervals)
 
     def find_insertion_point(self, mass):
-        lo = 0
-        hi = len(self)
-        if hi == 0:
+        centers = self._get_centers()
+        n = len(centers)
+        if n == 0:
             return 0, False
-        while hi != lo:
-            mid = (hi + lo) // 2
-            x = self[mid]
-            err = x.center - mass
-            if abs(err) <= 1e-9:
-                return mid, True
-            elif (hi - lo) == 1:
-                return mid, False
-            elif err > 0:
-                hi = mid
-            else:
-                lo = mid
-        raise ValueError((hi, lo, err, len(self)))
+        i = bisect_left(centers, mass)
+        if i < n and abs(centers[i] - mass) <= 1e-9:
+            return i, True
+        if i > 0 and abs(centers[i - 1] - mass) <= 1e-9:
+            return i - 1, True
+        return max(i - 1, 0), False
 
     def extend_interval(self, target, expansion):
         logger.debug("Extending %r by %r", target, expansion)
         self._invalidate()
+        self._centers = None
         target.extend(expansion)
         i, _ = self.find_insertion_point(target.center)
         consolidate = False
@@ -186,34 +194,41 @@ class IntervalSet(object):
     def _insert_interval(self, index, interval):
         self._invalidate()
         self.intervals.insert(index, interval)
+        if self._centers is not None:
+            self._centers.insert(index, interval.center)
 
     def find_interval(self, query):
+        # Walk the same probes as a binary search over the intervals, since an interval
+        # containing the query may be further from its center than the two bracketing it.
+        centers = self._get_centers()
+        intervals = self.intervals
+        center = query.center
         lo = 0
-        n = hi = len(self)
+        n = hi = len(centers)
         while hi != lo:
             mid = (hi + lo) // 2
-            x = self[mid]
-            err = x.center - query.center
-            if err == 0 or x.contains_interval(query):
-                return x
+            err = centers[mid] - center
+            if err == 0 or intervals[mid].contains_interval(query):
+                return intervals[mid]
             elif (hi - 1) == lo:
                 best_err = abs(err)
                 best_i = mid
                 if mid < (n - 1):
-                    err = abs(self[mid + 1].center - query.center)
+                    err = abs(centers[mid + 1] - center)
                     if err < best_err:
                         best_err = err
                         best_i = mid + 1
-                if mid > -1:
-                    err = abs(self[mid - 1].center - query.center)
+                if mid > 0:
+                    err = abs(centers[mid - 1] - center)
                     if err < best_err:
                         best_err = err
                         best_i = mid - 1
-                return self[best_i]
+                return intervals[best_i]
             elif err > 0:
                 hi = mid
             else:
                 lo = mid
+        return None
 
     def find(self, mass, ppm_error_tolerance):
         return self.find_interval(PPMQueryInterval(mass, ppm_error_tolerance))
@@ -222,19 +237,28 @@ class IntervalSet(object):
         self._invalidate()
         ix, match = self.find_insertion_point(center)
         self.intervals.pop(ix)
+        self._centers.pop(ix)
 
     def clear(self):
+        self._invalidate()
         self.intervals = []
+        self._centers = []
 
     def consolidate(self):
         intervals = list(self)
         self.clear()
         if len(intervals) == 0:
             return
+        # Lay the bounds out as arrays to find, in one pass, every interval which starts
+        # before the furthest end seen so far. Those must overlap the merged interval
+        # preceding them, so only the remaining candidate breaks need an explicit test.
+        starts = np.fromiter((x.start for x in intervals), dtype=float, count=len(intervals))
+        ends = np.fromiter((x.end for x in intervals), dtype=float, count=len(intervals))
+        must_merge = starts[1:] <= np.maximum.accumulate(ends)[:-1]
         result = []
         last = intervals[0]
-        for current in intervals[1:]:
-            if last.overlaps(current):
+        for current, merge in zip(intervals[1:], must_merge):
+            if merge or last.overlaps(current):
                 last.extend(current)
             else:
                 result.append(last)
@@ -244,13 +268,84 @@ class IntervalSet(object):
             self.insert_interval(r)
 
 
+class _IntervalLRUHead(object):
+    __slots__ = ('lru_forward', 'lru_backward')
+
+    def __init__(self):
+        self.lru_forward = self
+        self.lru_backward = self
+
+
+class IntervalLRUList(object):
+    """A least-recently-used ordering threaded directly through the
+    intervals it orders.
+
+    Each interval carries its own ``lru_forward`` and ``lru_backward``
+    links, so membership is tracked by object identity and no lookup table
+    keyed on the interval's (mutable) bounds is needed. An interval not in
+    the list has ``lru_forward`` set to :const:`None`.
+
+    Attributes
+    ----------
+    head : object
+        The sentinel node. ``head.lru_forward`` is the most recently used
+        interval and ``head.lru_backward`` is the least recently used.
+    """
+    def __init__(self):
+        self.head = _IntervalLRUHead()
+
+    def __contains__(self, interval):
+        return getattr(interval, 'lru_forward', None) is not None
+
+    def _unlink(self, interval):
+        interval.lru_backward.lru_forward = interval.lru_forward
+        interval.lru_forward.lru_backward = interval.lru_backward
+
+    def _link_front(self, interval):
+        head = self.head
+        interval.lru_forward = head.lru_forward
+        interval.lru_backward = head
+        head.lru_forward.lru_backward = interval
+        head.lru_forward = interval
+
+    def add_node(self, interval):
+        if interval in self:
+            self._unlink(interval)
+        self._link_front(interval)
+
+    hit_node = add_node
+
+    def remove_node(self, interval):
+        if interval in self:
+            self._unlink(interval)
+            interval.lru_forward = None
+            interval.lru_backward = None
+
+    def get_least_recently_used(self):
+        interval = self.head.lru_backward
+        if interval is self.head:
+            raise ValueError("Cannot get the least recently used item from an empty list")
+        return interval
+
+    def clear(self):
+        head = self.head
+        interval = head.lru_forward
+        while interval is not head:
+            next_interval = interval.lru_forward
+            interval.lru_forward = None
+            interval.lru_backward = None
+            interval = next_interval
+        head.lru_forward = head
+        head.lru_backward = head
+
+
 class LRUIntervalSet(IntervalSet):
 
     def __init__(self, intervals=None, max_size=1000):
         super(LRUIntervalSet, self).__init__(intervals)
         self.max_size = max_size
         self.current_size = len(self)
-        self.lru = LRUCache()
+        self.lru = IntervalLRUList()
         for item in self:
             self.lru.add_node(item)
 
@@ -277,10 +372,7 @@ class LRUIntervalSet(IntervalSet):
     def find_interval(self, query):
         match = super(LRUIntervalSet, self).find_interval(query)
         if match is not None:
-            try:
-                self.lru.hit_node(match)
-            except KeyError:
-                self.lru.add_node(match)
+            self.lru.hit_node(match)
         return match
 
     def remove_lru_interval(self):
@@ -292,7 +384,7 @@ class LRUIntervalSet(IntervalSet):
 
     def clear(self):
         super(LRUIntervalSet, self).clear()
-        self.lru = LRUCache()
+        self.lru.clear()
         self.current_size = len(self)
 
     def consolidate(self):
@@ -322,6 +414,8 @@ class MassIntervalNode(SpanningMixin):
     def __init__(self, interval):
         self.wrap(interval)
         self.growth = 0
+        self.lru_forward = None
+        self.lru_backward = None
 
     def __hash__(self):
         return hash((self.start, self.center, self.end))
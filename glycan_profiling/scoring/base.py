@@ -1,3 +1,5 @@
+import math
+
 import numpy as np
 try:
     import cPickle as pickle
@@ -177,16 +179,12 @@ class LogarithmicCountScoringModelBase(DiscreteCountScoringModelBase):
 
 
 def ones(x):
-    return (x - (np.floor(x / 10.) * 10))
+    return (x - (math.floor(x / 10.) * 10))
 
 
 def neighborhood_of(x, scale=100.):
     n = x / scale
-    up = ones(n) > 5
-    if up:
-        neighborhood = (np.floor(n / 10.) + 1) * 10
-    else:
-        neighborhood = (np.floor(n / 10.) + 1) * 10
+    neighborhood = (math.floor(n / 10.) + 1) * 10
     return neighborhood * scale
 
 
@@ -197,13 +195,25 @@ class MassScalingCountScoringModel(DiscreteCountScoringModelBase):
 
     def neighborhood_of(self, mass):
         n = mass / self.neighborhood_width
-        up = ones(n) > 5
-        if up:
-            neighborhood = (np.floor(n / 10.) + 1) * 10
-        else:
-            neighborhood = (np.floor(n / 10.) + 1) * 10
+        neighborhood = (math.floor(n / 10.) + 1) * 10
         return neighborhood * self.neighborhood_width
 
+    def neighborhoods_of(self, masses):
+        """Compute :meth:`neighborhood_of` for an array of masses at once
+
+        Parameters
+        ----------
+        masses : :class:`np.ndarray`
+            The masses to bin
+
+        Returns
+        -------
+        :class:`np.ndarray`
+        """
+        n = np.asarray(masses, dtype=float) / self.neighborhood_width
+        neighborhoods = (np.floor(n / 10.) + 1) * 10
+        return neighborhoods * self.neighborhood_width
+
     def get_neighborhood_key(self, neutral_mass):
         neighborhood = self.neighborhood_of(neutral_mass)
         return neighborhood
@@ -1,8 +1,9 @@
+import copy
 import json
+import math
 import warnings
 
 from collections import defaultdict
-from io import StringIO
 
 import numpy as np
 
@@ -69,16 +70,12 @@ def decay(x, step=0.4, rate=1.5):
 
 
 def ones(x):
-    return (x - (np.floor(x / 10.) * 10))
+    return (x - (math.floor(x / 10.) * 10))
 
 
 def neighborhood_of(x, scale=100.):
     n = x / scale
-    up = ones(n) > 5
-    if up:
-        neighborhood = (np.floor(n / 10.) + 1) * 10
-    else:
-        neighborhood = (np.floor(n / 10.) + 1) * 10
+    neighborhood = (math.floor(n / 10.) + 1) * 10
     return neighborhood * scale
 
 
@@ -120,13 +117,26 @@ class MassScalingChargeStateScoringModel(_CHARGE_MODEL, MassScalingCountScoringM
 
         self = cls({}, neighborhood_width=neighborhood_width)
 
-        for sol in observations:
-            neighborhood = self.neighborhood_of(sol.neutral_mass)
-            for c, val in self.get_signal_proportions(sol).items():
+        observations = list(observations)
+        neighborhoods = self.neighborhoods_of([sol.neutral_mass for sol in observations])
+        neighborhood_keys = []
+        charge_keys = []
+        for sol, neighborhood in zip(observations, neighborhoods):
+            for c in self.get_signal_proportions(sol):
                 c = self.transform_state(c)
                 if ignore_singly_charged and c == 1:
                     continue
-                bins[neighborhood][c] += 1
+                neighborhood_keys.append(neighborhood)
+                charge_keys.append(c)
+
+        # Count each (neighborhood, charge) pair in a single pass rather than
+        # incrementing nested dictionaries once per observed charge state.
+        if charge_keys:
+            pairs, pair_counts = np.unique(
+                np.column_stack((neighborhood_keys, charge_keys)),
+                axis=0, return_counts=True)
+            for (neighborhood, c), count in zip(pairs, pair_counts):
+                bins[neighborhood][int(c)] += float(count)
 
         model_table = {}
 
@@ -168,10 +178,15 @@ class MassScalingChargeStateScoringModel(_CHARGE_MODEL, MassScalingCountScoringM
         return cls(table=table, neighborhood_width=width)
 
     def clone(self):
-        text_buffer = StringIO()
-        self.dump(text_buffer)
-        text_buffer.seek(0)
-        return self.load(text_buffer)
+        # Copy the table directly with the same key normalization as :meth:`load`
+        # instead of round-tripping it through JSON text.
+        table = {
+            abs(float(neighborhood)): {abs(int(c)): float(v) for c, v in counts.items()}
+            for neighborhood, counts in self.table.items()
+        }
+        return self.__class__(
+            table=table, neighborhood_width=float(self.neighborhood_width),
+            fit_information=copy.deepcopy(self.fit_information))
 
 
 class WeightedMassScalingChargeStateScoringModel(MassScalingChargeStateScoringModel):
@@ -190,8 +205,9 @@ class WeightedMassScalingChargeStateScoringModel(MassScalingChargeStateScoringMo
 
         self = cls({}, neighborhood_width=neighborhood_width)
 
-        for sol in observations:
-            neighborhood = self.neighborhood_of(sol.neutral_mass)
+        observations = list(observations)
+        neighborhoods = self.neighborhoods_of([sol.neutral_mass for sol in observations])
+        for sol, neighborhood in zip(observations, neighborhoods):
             fit_info['count'][neighborhood] += 1
             for c, val in self.get_signal_proportions(sol).items():
                 c = self.transform_state(c)
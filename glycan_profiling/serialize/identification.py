@@ -72,6 +72,44 @@ class AmbiguousGlycopeptideGroup(Base, BoundToAnalysis):
     def __repr__(self):
         return "AmbiguousGlycopeptideGroup(%d)" % (self.id,)
 
+    @classmethod
+    def insert_group(cls, session, analysis_id):
+        """Insert a new, empty group row without going through the ORM unit of work.
+
+        Returns
+        -------
+        int:
+            The id of the new group
+        """
+        result = session.execute(cls.__table__.insert(), {"analysis_id": analysis_id})
+        return result.inserted_primary_key[0]
+
+    @classmethod
+    def insert_groups(cls, session, analysis_id, count):
+        """Insert `count` new, empty group rows.
+
+        On SQLite, the first row is inserted on its own, which takes the database's
+        write lock for the rest of the transaction and yields the current largest id,
+        so the remaining rows can be given the following ids explicitly and written
+        in a single bulk insert. Other databases allocate ids from sequences which
+        explicit ids would bypass, so each row is inserted separately.
+
+        Returns
+        -------
+        list of int:
+            The ids of the new groups, in insertion order
+        """
+        if count <= 0:
+            return []
+        first_id = cls.insert_group(session, analysis_id)
+        if session.get_bind().dialect.name != "sqlite":
+            return [first_id] + [cls.insert_group(session, analysis_id) for _ in range(count - 1)]
+        ids = list(range(first_id, first_id + count))
+        if count > 1:
+            session.execute(cls.__table__.insert(), [
+                {"id": group_id, "analysis_id": analysis_id} for group_id in ids[1:]])
+        return ids
+
     @classmethod
     def serialize(cls, members, session, analysis_id, *args, **kwargs):
         inst = cls(analysis_id=analysis_id)
@@ -214,15 +252,23 @@ class IdentifiedGlycopeptide(Base, IdentifiedStructure):
         return self.spectrum_cluster.spectrum_solutions
 
     @classmethod
-    def serialize(cls, obj, session, chromatogram_solution_id, tandem_cluster_id, analysis_id, *args, **kwargs):
-        inst = cls(
+    def get_fields_from_object(cls, obj, chromatogram_solution_id, tandem_cluster_id, analysis_id,
+                               ambiguous_id=None):
+        fields = dict(
             chromatogram_solution_id=chromatogram_solution_id,
             spectrum_cluster_id=tandem_cluster_id,
             analysis_id=analysis_id,
             q_value=obj.q_value,
             ms2_score=obj.ms2_score,
             ms1_score=obj.ms1_score,
-            structure_id=obj.structure.id)
+            structure_id=obj.structure.id,
+            ambiguous_id=ambiguous_id)
+        return fields
+
+    @classmethod
+    def serialize(cls, obj, session, chromatogram_solution_id, tandem_cluster_id, analysis_id, *args, **kwargs):
+        inst = cls(**cls.get_fields_from_object(
+            obj, chromatogram_solution_id, tandem_cluster_id, analysis_id))
         session.add(inst)
         session.flush()
         return inst
@@ -1,13 +1,19 @@
+from bisect import bisect_left
 from collections import defaultdict
+from itertools import chain
 from uuid import uuid4
 
+from sqlalchemy import select, delete
+from sqlalchemy.orm import selectinload, joinedload
+
 from ms_deisotope.output.common import (ScanDeserializerBase, ScanBunch)
 
 from glycan_profiling.task import TaskBase
 
 from .connection import DatabaseBoundOperation
 from .spectrum import (
-    MSScan, PrecursorInformation, SampleRun, DeconvolutedPeak)
+    MSScan, PrecursorInformation, SampleRun, DeconvolutedPeak,
+    make_memory_deconvoluted_peak)
 
 from .analysis import Analysis
 from .chromatogram import (
@@ -36,9 +42,20 @@ from .identification import (
     IdentifiedGlycopeptide)
 
 
+# The chromatogram-to-cluster join rows are written once per saved chromatogram,
+# so their INSERT constructs are built once here rather than on every call.
+_glycan_composition_cluster_join_insert = (
+    GlycanCompositionChromatogramToGlycanCompositionSpectrumCluster.insert())  # pylint: disable=no-value-for-parameter
+_unidentified_cluster_join_insert = (
+    UnidentifiedChromatogramToUnidentifiedSpectrumCluster.insert())  # pylint: disable=no-value-for-parameter
+
+
 class AnalysisSerializer(DatabaseBoundOperation, TaskBase):
     def __init__(self, connection, sample_run_id, analysis_name, analysis_id=None):
         DatabaseBoundOperation.__init__(self, connection)
+        # The serializer only writes, so the rows it has already written (and the
+        # mass shifts and compositions it caches) need not be reloaded after each commit.
+        self._sessionmaker.configure(expire_on_commit=False)
         session = self.session
         self.sample_run_id = sample_run_id
 
@@ -50,7 +67,7 @@ class AnalysisSerializer(DatabaseBoundOperation, TaskBase):
         self._mass_shift_cache = MassShiftSerializer(session)
         self._composition_cache = CompositionGroupSerializer(session)
         self._node_peak_map = dict()
-        self._scan_id_map = self._build_scan_id_map()
+        self._scan_id_map_cache = None
         self._chromatogram_solution_id_map = dict()
 
     def __repr__(self):
@@ -66,9 +83,17 @@ class AnalysisSerializer(DatabaseBoundOperation, TaskBase):
         self.set_peak_lookup_table(peak_mapping)
 
     def _build_scan_id_map(self):
-        return dict(self.session.query(
-            MSScan.scan_id, MSScan.id).filter(
-                MSScan.sample_run_id == self.sample_run_id))
+        scan_table = MSScan.__table__
+        rows = self.session.execute(
+            select([scan_table.c.scan_id, scan_table.c.id]).where(
+                scan_table.c.sample_run_id == self.sample_run_id))
+        return {scan_id: db_id for scan_id, db_id in rows}
+
+    @property
+    def _scan_id_map(self):
+        if self._scan_id_map_cache is None:
+            self._scan_id_map_cache = self._build_scan_id_map()
+        return self._scan_id_map_cache
 
     @property
     def analysis(self):
@@ -148,11 +173,10 @@ class AnalysisSerializer(DatabaseBoundOperation, TaskBase):
             node_peak_map=self._node_peak_map)
         if cluster_id is not None:
             self.session.execute(
-                GlycanCompositionChromatogramToGlycanCompositionSpectrumCluster.insert(), { # pylint: disable=no-value-for-parameter
+                _glycan_composition_cluster_join_insert, {
                     "chromatogram_id": result.id,
                     "cluster_id": cluster_id
                 })
-            self.session.flush()
         try:
             self._chromatogram_solution_id_map[solution.id] = result.solution.id
         except AttributeError:
@@ -177,11 +201,10 @@ class AnalysisSerializer(DatabaseBoundOperation, TaskBase):
             node_peak_map=self._node_peak_map)
         if cluster_id is not None:
             self.session.execute(
-                UnidentifiedChromatogramToUnidentifiedSpectrumCluster.insert(), {  # pylint: disable=no-value-for-parameter
+                _unidentified_cluster_join_insert, {
                     "chromatogram_id": result.id,
                     "cluster_id": cluster_id
                 })
-            self.session.flush()
         try:
             self._chromatogram_solution_id_map[solution.id] = result.solution.id
         except AttributeError:
@@ -213,7 +236,7 @@ class AnalysisSerializer(DatabaseBoundOperation, TaskBase):
             self.commit()
         return inst
 
-    def save_glycopeptide_identification(self, identification, commit=False):
+    def _save_glycopeptide_identification_components(self, identification):
         if identification.chromatogram is not None:
             chromatogram_solution = self.save_chromatogram_solution(
                 identification.chromatogram, commit=False)
@@ -223,15 +246,39 @@ class AnalysisSerializer(DatabaseBoundOperation, TaskBase):
         cluster = GlycopeptideSpectrumCluster.serialize(
             identification, self.session, self._scan_id_map, self._mass_shift_cache,
             analysis_id=self.analysis_id)
-        cluster_id = cluster.id
+        return chromatogram_solution_id, cluster.id
+
+    def save_glycopeptide_identification(self, identification, commit=False):
+        chromatogram_solution_id, cluster_id = self._save_glycopeptide_identification_components(
+            identification)
         inst = IdentifiedGlycopeptide.serialize(
             identification, self.session, chromatogram_solution_id, cluster_id, analysis_id=self.analysis_id)
         if commit:
             self.commit()
         return inst
 
-    def save_glycopeptide_identification_set(self, identification_set, commit=False):
+    def save_glycopeptide_identification_set(self, identification_set, commit=False, batch_size=1000):
+        """Save a collection of identified glycopeptides, grouping those which share
+        a chromatogram into a single :class:`AmbiguousGlycopeptideGroup`.
+
+        Each distinct chromatogram is saved once, and the :class:`IdentifiedGlycopeptide`
+        rows are accumulated and written with one bulk insert per `batch_size` rows
+        instead of one ORM flush per identification.
+
+        Returns
+        -------
+        list of dict:
+            The column values written for each identification
+        """
+        # Bind the serializer's state to locals once, rather than resolving
+        # the same attributes and properties for every identification.
+        session = self.session
+        analysis_id = self.analysis_id
+        scan_id_map = self._scan_id_map
+        mass_shift_cache = self._mass_shift_cache
+
         cache = defaultdict(list)
+        chromatogram_ids = dict()
         no_chromatograms = []
         out = []
         n = len(identification_set)
@@ -240,18 +287,36 @@ class AnalysisSerializer(DatabaseBoundOperation, TaskBase):
             i += 1
             if i % 100 == 0:
                 self.log("%0.2f%% glycopeptides saved. (%d/%d), %r" % (i * 100. / n, i, n, case))
-            saved = self.save_glycopeptide_identification(case)
-            if case.chromatogram is not None:
-                cache[case.chromatogram].append(saved)
+            chromatogram = case.chromatogram
+            if chromatogram is not None:
+                # Identifications which share a chromatogram share its saved row too
+                chromatogram_solution_id = chromatogram_ids.get(chromatogram)
+                if chromatogram_solution_id is None:
+                    chromatogram_solution_id = self.save_chromatogram_solution(chromatogram).id
+                    chromatogram_ids[chromatogram] = chromatogram_solution_id
+            else:
+                chromatogram_solution_id = None
+            cluster = GlycopeptideSpectrumCluster.serialize(
+                case, session, scan_id_map, mass_shift_cache, analysis_id=analysis_id)
+            saved = IdentifiedGlycopeptide.get_fields_from_object(
+                case, chromatogram_solution_id, cluster.id, analysis_id)
+            if chromatogram is not None:
+                cache[chromatogram].append(saved)
             else:
                 no_chromatograms.append(saved)
             out.append(saved)
-        for chromatogram, members in cache.items():
-            AmbiguousGlycopeptideGroup.serialize(
-                members, self.session, analysis_id=self.analysis_id)
-        for case in no_chromatograms:
-            AmbiguousGlycopeptideGroup.serialize(
-                [case], self.session, analysis_id=self.analysis_id)
+        # One group per shared chromatogram, then one for each identification without one
+        group_ids = AmbiguousGlycopeptideGroup.insert_groups(
+            session, analysis_id, len(cache) + len(no_chromatograms))
+        for members, group_id in zip(cache.values(), group_ids):
+            for member in members:
+                member['ambiguous_id'] = group_id
+        for case, group_id in zip(no_chromatograms, group_ids[len(cache):]):
+            case['ambiguous_id'] = group_id
+        for i in range(0, len(out), batch_size):
+            session.execute(IdentifiedGlycopeptide.__table__.insert(), out[i:i + batch_size])
+        if commit:
+            self.commit()
         return out
 
     def commit(self):
@@ -334,14 +399,16 @@ class AnalysisDeserializer(DatabaseBoundOperation):
         return chroma
 
     def load_identified_glycopeptides_for_protein(self, protein_id):
-        q = self.query(IdentifiedGlycopeptide).join(Glycopeptide).filter(
+        q = self.query(IdentifiedGlycopeptide).join(Glycopeptide).options(
+            selectinload(IdentifiedGlycopeptide.spectrum_cluster)).filter(
             IdentifiedGlycopeptide.analysis_id == self.analysis_id,
             Glycopeptide.protein_id == protein_id).yield_per(100)
-        gps = [c.convert() for c in q]
+        gps = IdentifiedGlycopeptide.bulk_convert(q)
         return gps
 
     def load_identified_glycopeptides(self):
-        q = self.query(IdentifiedGlycopeptide).filter(
+        q = self.query(IdentifiedGlycopeptide).options(
+            selectinload(IdentifiedGlycopeptide.spectrum_cluster)).filter(
             IdentifiedGlycopeptide.analysis_id == self.analysis_id).yield_per(100)
         gps = IdentifiedGlycopeptide.bulk_convert(q)
         return gps
@@ -353,7 +420,7 @@ class AnalysisDeserializer(DatabaseBoundOperation):
                 Glycopeptide.glycan_combination_id == GlycanCombination.id).join(
                 IdentifiedGlycopeptide,
                 IdentifiedGlycopeptide.structure_id == Glycopeptide.id).filter(
-                IdentifiedGlycopeptide.analysis_id == self.analysis_id)
+                IdentifiedGlycopeptide.analysis_id == self.analysis_id).yield_per(100)
         gcs = [c for c in q]
         return gcs
 
@@ -368,37 +435,31 @@ class AnalysisDestroyer(DatabaseBoundOperation):
         self.analysis_id = analysis_id
 
     def delete_chromatograms(self):
-        self.session.query(Chromatogram).filter(
-            Chromatogram.analysis_id == self.analysis_id).delete(synchronize_session=False)
-        self.session.flush()
+        self.session.execute(delete(Chromatogram.__table__).where(
+            Chromatogram.analysis_id == self.analysis_id))
 
     def delete_chromatogram_solutions(self):
-        self.session.query(ChromatogramSolution).filter(
-            ChromatogramSolution.analysis_id == self.analysis_id).delete(synchronize_session=False)
-        self.session.flush()
+        self.session.execute(delete(ChromatogramSolution.__table__).where(
+            ChromatogramSolution.analysis_id == self.analysis_id))
 
     def delete_glycan_composition_chromatograms(self):
-        self.session.query(GlycanCompositionChromatogram).filter(
-            GlycanCompositionChromatogram.analysis_id == self.analysis_id).delete(synchronize_session=False)
-        self.session.flush()
+        self.session.execute(delete(GlycanCompositionChromatogram.__table__).where(
+            GlycanCompositionChromatogram.analysis_id == self.analysis_id))
 
     def delete_unidentified_chromatograms(self):
-        self.session.query(UnidentifiedChromatogram).filter(
-            UnidentifiedChromatogram.analysis_id == self.analysis_id).delete(synchronize_session=False)
-        self.session.flush()
+        self.session.execute(delete(UnidentifiedChromatogram.__table__).where(
+            UnidentifiedChromatogram.analysis_id == self.analysis_id))
 
     def delete_ambiguous_glycopeptide_groups(self):
-        self.session.query(AmbiguousGlycopeptideGroup).filter(
-            AmbiguousGlycopeptideGroup.analysis_id == self.analysis_id).delete(synchronize_session=False)
-        self.session.flush()
+        self.session.execute(delete(AmbiguousGlycopeptideGroup.__table__).where(
+            AmbiguousGlycopeptideGroup.analysis_id == self.analysis_id))
 
     def delete_identified_glycopeptides(self):
-        self.session.query(IdentifiedGlycopeptide).filter(
-            IdentifiedGlycopeptide.analysis_id == self.analysis_id).delete(synchronize_session=False)
-        self.session.flush()
+        self.session.execute(delete(IdentifiedGlycopeptide.__table__).where(
+            IdentifiedGlycopeptide.analysis_id == self.analysis_id))
 
     def delete_analysis(self):
-        self.session.query(Analysis).filter(Analysis.id == self.analysis_id).delete(synchronize_session=False)
+        self.session.execute(delete(Analysis.__table__).where(Analysis.id == self.analysis_id))
 
     def run(self):
         self.delete_ambiguous_glycopeptide_groups()
@@ -411,7 +472,18 @@ class AnalysisDestroyer(DatabaseBoundOperation):
 
 
 def flatten(iterable):
-    return [y for x in iterable for y in x]
+    return list(chain.from_iterable(iterable))
+
+
+def _floor_position(values, key):
+    """Find the position of `key` in the sorted list `values`, or of the
+    greatest element less than `key` if it is absent, clamped to the start
+    of the list.
+    """
+    i = bisect_left(values, key)
+    if i < len(values) and values[i] == key:
+        return i
+    return max(i - 1, 0)
 
 
 class DatabaseScanDeserializer(ScanDeserializerBase, DatabaseBoundOperation):
@@ -425,11 +497,15 @@ class DatabaseScanDeserializer(ScanDeserializerBase, DatabaseBoundOperation):
         self._sample_run_id = sample_run_id
         self._iterator = None
         self._scan_id_to_retention_time_cache = None
+        self._index_cache = {}
 
     def _intialize_scan_id_to_retention_time_cache(self):
-        self._scan_id_to_retention_time_cache = dict(
-            self.session.query(MSScan.scan_id, MSScan.scan_time).filter(
-                MSScan.sample_run_id == self.sample_run_id))
+        scan_table = MSScan.__table__
+        rows = self.session.execute(
+            select([scan_table.c.scan_id, scan_table.c.scan_time]).where(
+                scan_table.c.sample_run_id == self.sample_run_id))
+        self._scan_id_to_retention_time_cache = {
+            scan_id: scan_time for scan_id, scan_time in rows}
 
     def __reduce__(self):
         return self.__class__, (
@@ -483,54 +559,38 @@ class DatabaseScanDeserializer(ScanDeserializerBase, DatabaseBoundOperation):
     def convert_scan_id_to_retention_time(self, scan_id):
         if self._scan_id_to_retention_time_cache is None:
             self._intialize_scan_id_to_retention_time_cache()
-        try:
-            return self._scan_id_to_retention_time_cache[scan_id]
-        except KeyError:
-            q = self.session.query(MSScan.scan_time).filter(
-                MSScan.scan_id == scan_id, MSScan.sample_run_id == self.sample_run_id).scalar()
-            self._scan_id_to_retention_time_cache[scan_id] = q
-            return q
+        # The cache holds every scan in the sample run, so a miss means the scan does not exist
+        return self._scan_id_to_retention_time_cache[scan_id]
 
     def _select_index(self, require_ms1=True):
+        try:
+            return self._index_cache[require_ms1]
+        except KeyError:
+            pass
         indices_q = self.session.query(MSScan.index).filter(
             MSScan.sample_run_id == self.sample_run_id).order_by(MSScan.index.asc())
         if require_ms1:
             indices_q = indices_q.filter(MSScan.ms_level == 1)
-        indices = flatten(indices_q.all())
+        indices = [row[0] for row in indices_q]
+        self._index_cache[require_ms1] = indices
         return indices
 
     def _iterate_over_index(self, start=0, require_ms1=True):
         indices = self._select_index(require_ms1)
-        try:
-            i = indices.index(start)
-        except ValueError:
-            lo = 0
-            hi = len(indices)
-
-            while lo != hi:
-                mid = (lo + hi) // 2
-                x = indices[mid]
-                if x == start:
-                    i = mid
-                    break
-                elif lo == (hi - 1):
-                    i = mid
-                    break
-                elif x > start:
-                    hi = mid
-                else:
-                    lo = mid
-        items = indices[i:]
-        i = 0
-        n = len(items)
-        while i < n:
-            index = items[i]
-            scan = self.session.query(MSScan).filter(
-                MSScan.index == index,
-                MSScan.sample_run_id == self.sample_run_id).one()
+        if not indices:
+            return
+        i = _floor_position(indices, start)
+        # Stream the scans from the starting index onwards in one ordered query, loading
+        # each window's product scans together instead of issuing a query per scan.
+        q = self.session.query(MSScan).options(
+            selectinload(MSScan.product_information).joinedload(PrecursorInformation.product)).filter(
+            MSScan.sample_run_id == self.sample_run_id,
+            MSScan.index >= indices[i]).order_by(MSScan.index.asc())
+        if require_ms1:
+            q = q.filter(MSScan.ms_level == 1)
+        for scan in q.yield_per(200):
             products = [pi.product for pi in scan.product_information]
             yield ScanBunch(scan.convert(), [p.convert() for p in products])
-            i += 1
 
     def __iter__(self):
         return self
@@ -546,33 +606,16 @@ class DatabaseScanDeserializer(ScanDeserializerBase, DatabaseBoundOperation):
         return q
 
     def _get_scan_by_time(self, rt, require_ms1=False):
-        times_q = self.session.query(MSScan.scan_time).filter(
-            MSScan.sample_run_id == self.sample_run_id).order_by(MSScan.scan_time.asc())
+        q = self.session.query(MSScan).filter(
+            MSScan.sample_run_id == self.sample_run_id)
         if require_ms1:
-            times_q = times_q.filter(MSScan.ms_level == 1)
-        times = flatten(times_q.all())
-        try:
-            i = times.index(rt)
-        except ValueError:
-            lo = 0
-            hi = len(times)
-
-            while lo != hi:
-                mid = (lo + hi) // 2
-                x = times[mid]
-                if x == rt:
-                    i = mid
-                    break
-                elif lo == (hi - 1):
-                    i = mid
-                    break
-                elif x > rt:
-                    hi = mid
-                else:
-                    lo = mid
-        scan = self.session.query(MSScan).filter(
-            MSScan.scan_time == times[i],
-            MSScan.sample_run_id == self.sample_run_id).one()
+            q = q.filter(MSScan.ms_level == 1)
+        # Take the last scan at or before `rt`, falling back to the first scan
+        # of the run when `rt` precedes it.
+        scan = q.filter(MSScan.scan_time <= rt).order_by(
+            MSScan.scan_time.desc()).first()
+        if scan is None:
+            scan = q.order_by(MSScan.scan_time.asc()).first()
         return scan
 
     def reset(self):
@@ -597,9 +640,12 @@ class DatabaseScanDeserializer(ScanDeserializerBase, DatabaseBoundOperation):
         return mem
 
     def _locate_ms1_scan(self, scan):
-        while scan.ms_level != 1:
-            scan = self._get_scan_by_index(scan.index - 1)
-        return scan
+        if scan.ms_level == 1:
+            return scan
+        return self.session.query(MSScan).filter(
+            MSScan.sample_run_id == self.sample_run_id,
+            MSScan.ms_level == 1,
+            MSScan.index <= scan.index).order_by(MSScan.index.desc()).first()
 
     def start_from_scan(self, scan_id=None, rt=None, index=None, require_ms1=True):
         if scan_id is None:
@@ -632,16 +678,49 @@ class DatabaseScanDeserializer(ScanDeserializerBase, DatabaseBoundOperation):
             q = q.filter(MSScan.scan_time <= end_time)
         return q
 
-    def ms1_peaks_above(self, threshold=1000):
+    def ms1_peaks_above(self, threshold=1000, intensity_threshold=None):
+        """Read out all MS1 peaks from this sample run whose neutral mass exceeds
+        `threshold`, and whose intensity is at least `intensity_threshold` if given.
+
+        The peak columns are read through a Core SELECT and the in-memory peaks are
+        built straight from the rows, without loading ORM :class:`DeconvolutedPeak`
+        instances into the session's identity map.
+
+        Returns
+        -------
+        list of tuple:
+            Triples of the MS1 scan's ID, the :class:`~.DeconvolutedPeak` and its
+            database id
+        """
+        scan_table = MSScan.__table__
+        peak_table = DeconvolutedPeak.__table__
+        stmt = select([scan_table.c.scan_id.label("ms1_scan_id"), peak_table]).select_from(
+            scan_table.join(peak_table, peak_table.c.scan_id == scan_table.c.id)).where(
+            (scan_table.c.ms_level == 1) &
+            (scan_table.c.sample_run_id == self.sample_run_id) &
+            (peak_table.c.neutral_mass > threshold))
+        if intensity_threshold is not None:
+            stmt = stmt.where(peak_table.c.intensity >= intensity_threshold)
+        stmt = stmt.order_by(scan_table.c.index)
+        connection = self.session.connection()
+        if connection.dialect.name != "sqlite":
+            stmt = stmt.execution_options(stream_results=True)
         accumulate = [
-            (x[0], x[1].convert(), x[1].id) for x in self.session.query(MSScan.scan_id, DeconvolutedPeak).join(
-                DeconvolutedPeak).filter(
-                MSScan.ms_level == 1, MSScan.sample_run_id == self.sample_run_id,
-                DeconvolutedPeak.neutral_mass > threshold
-            ).order_by(MSScan.index).yield_per(1000)]
+            (row.ms1_scan_id, make_memory_deconvoluted_peak(row), row.id)
+            for row in connection.execute(stmt)
+        ]
         return accumulate
 
     def precursor_information(self):
+        """Iterate over the precursor information of every MSn scan in the sample run.
+
+        The rows are streamed in batches rather than loaded all at once; callers
+        which need random access should materialize them with :func:`list`.
+
+        Returns
+        -------
+        :class:`~.Query`
+        """
         prec_info = self.session.query(PrecursorInformation).filter(
-            PrecursorInformation.sample_run_id == self.sample_run_id).all()
+            PrecursorInformation.sample_run_id == self.sample_run_id).yield_per(500)
         return prec_info
@@ -20,8 +20,8 @@ class SpectrumEvaluatorBase(object):
         A mapping from scan id to :class:`~.ProcessedScan`
     mass_shift_map: Mapping
         A mapping from mass shift name to :class:`~.MassShift`
-    solution_map: Mapping
-        A mapping from (scan id, mass shift name) to the packaged match.
+    solution_map: list
+        The (scan id, mass shift name, packaged match) triples for the current structure.
     """
 
     def fetch_scan(self, key):
@@ -59,7 +59,7 @@ class SpectrumEvaluatorBase(object):
         solution = self.evaluate(scan, structure, mass_shift=mass_shift,
                                  evaluation_context=evaluation_context,
                                  **self.evaluation_args)
-        self.solution_map[scan.id, mass_shift.name] = self.solution_packer(solution)
+        self.solution_map.append((scan.id, mass_shift.name, self.solution_packer(solution)))
         return solution
 
     def construct_cache_subgroups(self, work_order):
@@ -166,7 +166,7 @@ class LocalSpectrumEvaluator(SpectrumEvaluatorBase, TaskBase):
         self.scan_map = scan_map
         self.mass_shift_map = mass_shift_map
         self.solution_packer = solution_packer
-        self.solution_map = dict()
+        self.solution_map = []
         self.evaluation_args = evaluation_args
         try:
             self.construct_cache_subgroups = self.evaluator.construct_cache_subgroups
@@ -182,7 +182,7 @@ class LocalSpectrumEvaluator(SpectrumEvaluatorBase, TaskBase):
 
     def pack_output(self, target):
         package = (target.id, self.solution_map)
-        self.solution_map = dict()
+        self.solution_map = []
         return package
 
     def process(self, hit_map, hit_to_scan_map, scan_hit_type_map, hit_group_map=None):
@@ -264,8 +264,8 @@ class SequentialIdentificationProcessor(TaskBase):
         ----------
         target : object
             The structure that was matched
-        score_map : dict
-            Maps (scan id, mass shift name) to score
+        score_map : list
+            The (scan id, mass shift name, packed score) triples for each match
         """
         self.solution_handler(target, score_map)
 
@@ -281,9 +281,8 @@ class SolutionHandler(TaskBase):
         self.counter = 0
 
     def _make_spectrum_match(self, scan_id, target, score, shift_type):
-        return SpectrumMatch(
-            self.scan_map[scan_id], target, score,
-            mass_shift=self.mass_shift_map[shift_type])
+        return SpectrumMatch._create(
+            self.scan_map[scan_id], target, score, self.mass_shift_map[shift_type])
 
     def store_result(self, target, score_map):
         """Save the spectrum match scores for ``target`` against the
@@ -293,19 +292,23 @@ class SolutionHandler(TaskBase):
         ----------
         target : object
             The structure that was matched
-        score_map : dict
-            Maps (scan id, mass shift name) to score
+        score_map : list
+            The (scan id, mass shift name, packed score) triples for each match
         """
         self.counter += 1
+        # Resolve the bound methods and the solution map once per target rather than
+        # once per spectrum match
+        scan_solution_map = self.scan_solution_map
+        unpack = self.packer.unpack
+        make_spectrum_match = self._make_spectrum_match
         j = 0
-        for hit_spec, result_pack in score_map.items():
-            scan_id, shift_type = hit_spec
-            score = self.packer.unpack(result_pack)
+        for scan_id, shift_type, result_pack in score_map:
+            score = unpack(result_pack)
             j += 1
             if j % 1000 == 0:
                 self.log("...... Mapping match %d for %s on %s with score %r" % (j, target, scan_id, score))
-            psm = self._make_spectrum_match(scan_id, target, score, shift_type)
-            self.scan_solution_map[scan_id].append(psm)
+            psm = make_spectrum_match(scan_id, target, score, shift_type)
+            scan_solution_map[scan_id].append(psm)
 
     def __call__(self, target, score_map):
         return self.store_result(target, score_map)
@@ -327,14 +330,15 @@ class MultiScoreSolutionHandler(SolutionHandler):
             scan_solution_map, scan_map, mass_shift_map, packer)
 
     def _make_spectrum_match(self, scan_id, target, score, shift_type):
-        return MultiScoreSpectrumMatch(
-            self.scan_map[scan_id], target, score,
-            mass_shift=self.mass_shift_map[shift_type])
+        return MultiScoreSpectrumMatch._create(
+            self.scan_map[scan_id], target, score, self.mass_shift_map[shift_type])
 
 
 class MultiScoreSolutionPacker(object):
+    # The :class:`ScoreSet` is already a compact, picklable value, so it is passed through
+    # as-is instead of being serialized to bytes and rebuilt for every spectrum match
     def __call__(self, spectrum_match):
-        return ScoreSet.from_spectrum_matcher(spectrum_match).pack()
+        return ScoreSet.from_spectrum_matcher(spectrum_match)
 
     def unpack(self, package):
-        return ScoreSet.unpack(package)
+        return package
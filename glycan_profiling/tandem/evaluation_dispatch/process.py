@@ -27,7 +27,7 @@ from glycan_profiling.structure import LRUMapping
 
 from .evaluation import SolutionHandler, LocalSpectrumEvaluator, SpectrumEvaluatorBase
 from .task import TaskQueueFeeder
-from .utils import SentinelToken, ProcessDispatcherState
+from .utils import SentinelToken, ProcessDispatcherState, SharedMemoryScanMap
 
 
 debug_mode = bool(os.environ.get("GLYCRESOFTDEBUG"))
@@ -70,11 +70,14 @@ class IdentificationProcessDispatcher(TaskBase):
         The queue which worker processes will
         put ther results on, read in the main
         process.
-    scan_load_map : multiprocessing.SyncManager.dict
-        An inter-process synchronized dictionary which
-        maps scan ids to scans. Used by worker processes
-        to request individual scans by name when they are
-        not found locally.
+    scan_load_map : SharedMemoryScanMap or multiprocessing.SyncManager.dict
+        An inter-process shared mapping from scan ids to
+        serialized scans. Used by worker processes to load
+        individual scans by name when they are not found
+        locally. A :class:`SharedMemoryScanMap` is used when
+        shared memory is available, falling back to a dictionary
+        synchronized through :attr:`ipc_manager`. This is an
+        empty :class:`dict` until :meth:`create_pool` is called.
     scan_solution_map : defaultdict(list)
         A mapping from scan id to all candidate solutions.
     scorer_type : SpectrumMatcherBase
@@ -123,7 +126,7 @@ class IdentificationProcessDispatcher(TaskBase):
         self.workers = []
         self.log_controller = self.ipc_logger()
         self.local_scan_map = dict()
-        self.scan_load_map = self.ipc_manager.dict()
+        self.scan_load_map = dict()
         self.local_mass_shift_map = mass_shift_map
         self.mass_shift_load_map = self.ipc_manager.dict(mass_shift_map)
         self.structure_map = dict()
@@ -136,6 +139,13 @@ class IdentificationProcessDispatcher(TaskBase):
     def scan_solution_map(self):
         return self.solution_handler.scan_solution_map
 
+    def _make_scan_load_map(self, serialized_scans):
+        if SharedMemoryScanMap.is_available():
+            return SharedMemoryScanMap(serialized_scans)
+        scan_load_map = self.ipc_manager.dict()
+        scan_load_map.update(serialized_scans)
+        return scan_load_map
+
     def _make_input_queue(self):
         try:
             return JoinableQueue(int(1e5))
@@ -184,9 +194,10 @@ class IdentificationProcessDispatcher(TaskBase):
         """
         self.state = ProcessDispatcherState.spawning
         self.scan_load_map.clear()
-        # Do not copy the complete scan object into the IPC manager dict, as this will
+        # Do not share the complete scan object with the workers, as this will
         # pickle the scan source, and then unpickle it several times on the recieving end.
-        self.scan_load_map.update({k: pickle.dumps(v.copy(deep=False).unbind(), -1) for k, v in scan_map.items()})
+        self.scan_load_map = self._make_scan_load_map(
+            {k: pickle.dumps(v.copy(deep=False).unbind(), -1) for k, v in scan_map.items()})
         self.local_scan_map.clear()
         self.local_scan_map.update(scan_map)
 
@@ -288,8 +299,8 @@ class IdentificationProcessDispatcher(TaskBase):
         ----------
         target : object
             The structure that was matched
-        score_map : dict
-            Maps (scan id, mass shift name) to score
+        score_map : list
+            The (scan id, mass shift name, packed score) triples for each match
         scan_map : dict
             Maps scan id to :class:`.ProcessedScan`
         """
@@ -373,76 +384,111 @@ class IdentificationProcessDispatcher(TaskBase):
         """
         self.structure_map = hit_map
         self.solution_handler.scan_map = scan_map
-        self.create_pool(scan_map)
-
-        # Won't feed hit groups until after more work is done here.
-        feeder_thread = self.spawn_queue_feeder(
-            hit_map, hit_to_scan, scan_hit_type_map, hit_group_map)
-        has_work = True
-        i = 0
-        scan_count = len(scan_map)
-        n = len(hit_to_scan)
-        if n != len(hit_map):
-            self.log("There is a mismatch between hit_map (%d) and hit_to_scan (%d)" % (
-                len(hit_map), n))
-        n_spectrum_matches = sum(map(len, hit_to_scan.values()))
-        # Track the iteration number a particular structure (id) has been received
-        # on. This may be used to detect if a structure has been received multiple
-        # times, and to determine when all expected structures have been received.
-        seen = dict()
-        # Keep a running tally of the number of iterations when there are pending
-        # structure matches to process, but all workers claim to be done.
-        strikes = 0
-        self.state = ProcessDispatcherState.running
-        self.log("... Searching Matches (%d)" % (n_spectrum_matches,))
-        last_log_time = start_time = time.time()
-        should_log = False
-        log_cycle = 5000
-        while has_work:
-            try:
-                payload = self.get_result(seen, hit_map)
-                if payload is None:
-                    continue
-                else:
-                    (target_id, score_map, token) = payload
-                target = hit_map.get(target_id, target_id)
-                if target.id in seen:
-                    self.log(
-                        "...... Duplicate Results For %s. First seen at %r, now again at %r" % (
-                            target, seen[target.id], (i, token)))
-                else:
-                    seen[target.id] = (i, token)
-                if (i > n) and ((i - n) % 10 == 0):
-                    self.log(
-                        "...... Warning: %d additional output received. %s and %d matches." % (
-                            i - n, target, len(score_map)))
-
-                i += 1
-                strikes = 0
-                if i % log_cycle == 0 or should_log:
-                    last_log_time = time.time()
-                    should_log = False
-                    self.log(
-                        "...... Processed %d structures (%0.2f%%)" % (i, i * 100. / n))
-                self.store_result(target, score_map)
-            except QueueEmptyException:
-                if len(seen) == n:
-                    has_work = False
-                # do worker life cycle management here
-                elif self.all_workers_finished():
+        # The pool holds a shared memory block, which must be released even if
+        # starting the workers or consuming their results fails.
+        try:
+            self.create_pool(scan_map)
+
+            # Won't feed hit groups until after more work is done here.
+            feeder_thread = self.spawn_queue_feeder(
+                hit_map, hit_to_scan, scan_hit_type_map, hit_group_map)
+            has_work = True
+            i = 0
+            scan_count = len(scan_map)
+            n = len(hit_to_scan)
+            if n != len(hit_map):
+                self.log("There is a mismatch between hit_map (%d) and hit_to_scan (%d)" % (
+                    len(hit_map), n))
+            n_spectrum_matches = sum(map(len, hit_to_scan.values()))
+            # Track the iteration number a particular structure (id) has been received
+            # on. This may be used to detect if a structure has been received multiple
+            # times, and to determine when all expected structures have been received.
+            seen = dict()
+            # Keep a running tally of the number of iterations when there are pending
+            # structure matches to process, but all workers claim to be done.
+            strikes = 0
+            self.state = ProcessDispatcherState.running
+            self.log("... Searching Matches (%d)" % (n_spectrum_matches,))
+            last_log_time = start_time = time.time()
+            should_log = False
+            log_cycle = 5000
+            while has_work:
+                try:
+                    payload = self.get_result(seen, hit_map)
+                    if payload is None:
+                        continue
+                    else:
+                        (target_id, score_map, token) = payload
+                    target = hit_map.get(target_id, target_id)
+                    if target.id in seen:
+                        self.log(
+                            "...... Duplicate Results For %s. First seen at %r, now again at %r" % (
+                                target, seen[target.id], (i, token)))
+                    else:
+                        seen[target.id] = (i, token)
+                    if (i > n) and ((i - n) % 10 == 0):
+                        self.log(
+                            "...... Warning: %d additional output received. %s and %d matches." % (
+                                i - n, target, len(score_map)))
+
+                    i += 1
+                    strikes = 0
+                    if i % log_cycle == 0 or should_log:
+                        last_log_time = time.time()
+                        should_log = False
+                        self.log(
+                            "...... Processed %d structures (%0.2f%%)" % (i, i * 100. / n))
+                    self.store_result(target, score_map)
+                except QueueEmptyException:
                     if len(seen) == n:
                         has_work = False
+                    # do worker life cycle management here
+                    elif self.all_workers_finished():
+                        if len(seen) == n:
+                            has_work = False
+                        else:
+                            strikes += 1
+                            if strikes % 50 == 0:
+                                self.log(
+                                    "...... %d cycles without output (%d/%d, %0.2f%% Done)" % (
+                                        strikes, len(seen), n, len(seen) * 100. / n))
+                            if strikes > self.post_search_trailing_timeout:
+                                self.state = ProcessDispatcherState.running_local_workers_dead
+                                self.log(
+                                    "...... Too much time has elapsed with"
+                                    " missing items. Evaluating serially.")
+                                i += self._reconstruct_missing_work_items(
+                                    seen, hit_map, hit_to_scan, scan_hit_type_map)
+                                has_work = False
+                                self.debug("...... Processes")
+                                for worker in self.workers:
+                                    self.debug("......... %r" % (worker,))
+                                self.debug("...... IPC Manager: %r" % (self.ipc_manager,))
                     else:
                         strikes += 1
+                        if strikes % 10 == 0:
+                            check_time = time.time()
+                            if check_time - last_log_time > 10:
+                                should_log = True
                         if strikes % 50 == 0:
                             self.log(
-                                "...... %d cycles without output (%d/%d, %0.2f%% Done)" % (
-                                    strikes, len(seen), n, len(seen) * 100. / n))
-                        if strikes > self.post_search_trailing_timeout:
-                            self.state = ProcessDispatcherState.running_local_workers_dead
+                                "...... %d cycles without output (%d/%d, %0.2f%% Done, %d children still alive)" % (
+                                    strikes, len(seen), n, len(seen) * 100. / n,
+                                    len(multiprocessing.active_children()) - 1))
+                            try:
+                                input_queue_size = self.input_queue.qsize()
+                            except Exception:
+                                input_queue_size = -1
+                            is_feeder_done = self.producer_thread_done_event.is_set()
+                            self.log("...... Input Queue Status: %r. Is Feeder Done? %r" % (
+                                input_queue_size, is_feeder_done))
+                        if strikes > (self.child_failure_timeout * (1 + (scan_count / 500.0) * (
+                                not self._has_remote_error))):
+                            self.state = ProcessDispatcherState.running_local_workers_live
                             self.log(
-                                "...... Too much time has elapsed with"
-                                " missing items. Evaluating serially.")
+                                ("...... Too much time has elapsed with"
+                                 " missing items (%d children still alive). Evaluating serially.") % (
+                                     len(multiprocessing.active_children()) - 1,))
                             i += self._reconstruct_missing_work_items(
                                 seen, hit_map, hit_to_scan, scan_hit_type_map)
                             has_work = False
@@ -450,47 +496,16 @@ class IdentificationProcessDispatcher(TaskBase):
                             for worker in self.workers:
                                 self.debug("......... %r" % (worker,))
                             self.debug("...... IPC Manager: %r" % (self.ipc_manager,))
-                else:
-                    strikes += 1
-                    if strikes % 10 == 0:
-                        check_time = time.time()
-                        if check_time - last_log_time > 10:
-                            should_log = True
-                    if strikes % 50 == 0:
-                        self.log(
-                            "...... %d cycles without output (%d/%d, %0.2f%% Done, %d children still alive)" % (
-                                strikes, len(seen), n, len(seen) * 100. / n,
-                                len(multiprocessing.active_children()) - 1))
-                        try:
-                            input_queue_size = self.input_queue.qsize()
-                        except Exception:
-                            input_queue_size = -1
-                        is_feeder_done = self.producer_thread_done_event.is_set()
-                        self.log("...... Input Queue Status: %r. Is Feeder Done? %r" % (
-                            input_queue_size, is_feeder_done))
-                    if strikes > (self.child_failure_timeout * (1 + (scan_count / 500.0) * (
-                            not self._has_remote_error))):
-                        self.state = ProcessDispatcherState.running_local_workers_live
-                        self.log(
-                            ("...... Too much time has elapsed with"
-                             " missing items (%d children still alive). Evaluating serially.") % (
-                                 len(multiprocessing.active_children()) - 1,))
-                        i += self._reconstruct_missing_work_items(
-                            seen, hit_map, hit_to_scan, scan_hit_type_map)
-                        has_work = False
-                        self.debug("...... Processes")
-                        for worker in self.workers:
-                            self.debug("......... %r" % (worker,))
-                        self.debug("...... IPC Manager: %r" % (self.ipc_manager,))
-                continue
-
-        consumer_end = time.time()
-        self.debug("... Consumer Done (%0.3g sec.)" % (consumer_end - start_time))
-        self.consumer_done_event.set()
-        time.sleep(1) # Not a good solution but need to give workers a chance to sync
-        i_spectrum_matches = sum(map(len, self.scan_solution_map.values()))
-        self.log("... Finished Processing Matches (%d)" % (i_spectrum_matches,))
-        self.clear_pool()
+                    continue
+
+            consumer_end = time.time()
+            self.debug("... Consumer Done (%0.3g sec.)" % (consumer_end - start_time))
+            self.consumer_done_event.set()
+            time.sleep(1) # Not a good solution but need to give workers a chance to sync
+            i_spectrum_matches = sum(map(len, self.scan_solution_map.values()))
+            self.log("... Finished Processing Matches (%d)" % (i_spectrum_matches,))
+        finally:
+            self.clear_pool()
         self.debug("... Shutting Down Message Queue")
         self.log_controller.stop()
         self.debug("... Joining Feeder Thread (Done: %r)" % (self.producer_thread_done_event.is_set(), ))
@@ -526,7 +541,7 @@ class SpectrumIdentificationWorkerBase(Process, SpectrumEvaluatorBase):
         self.local_mass_shift_map = dict({
             Unmodified.name: Unmodified
         })
-        self.solution_map = dict()
+        self.solution_map = []
         self._work_complete = Event()
         self._work_complete.clear()
         self.log_handler = log_handler
@@ -611,7 +626,7 @@ class SpectrumIdentificationWorkerBase(Process, SpectrumEvaluatorBase):
         if self.solution_map:
             target_id = getattr(target, 'id', target)
             self._append_to_result_buffer((target_id, self.solution_map, self.token))
-        self.solution_map = dict()
+        self.solution_map = []
 
     def evaluate(self, scan, structure, evaluation_context=None, *args, **kwargs):
         raise NotImplementedError()
@@ -1,5 +1,10 @@
 from glypy.utils import Enum
 
+try:
+    from multiprocessing.shared_memory import SharedMemory
+except ImportError:
+    SharedMemory = None
+
 
 class SentinelToken(object):
     """An object to hold opaque identity information regarding a worker process,
@@ -33,3 +38,78 @@ class ProcessDispatcherState(Enum):
     terminating = 6
     terminating_workers_live = 7
     done = 8
+
+
+class SharedMemoryScanMap(object):
+    """A read-only mapping from scan id to serialized scan, stored in a single
+    :class:`multiprocessing.shared_memory.SharedMemory` block.
+
+    Worker processes read scans out of the block directly instead of requesting
+    each one from a manager process. When pickled, only the block's name and the
+    index are sent, and the receiving process attaches to the existing block.
+
+    Attributes
+    ----------
+    name : str
+        The name of the shared memory block
+    index : dict
+        Maps scan id to the (offset, size) of its serialized scan in the block
+    """
+
+    def __init__(self, serialized_scans):
+        self.index = dict()
+        offset = 0
+        for key, payload in serialized_scans.items():
+            self.index[key] = (offset, len(payload))
+            offset += len(payload)
+        # A zero-sized block cannot be created
+        self._shared_memory = SharedMemory(create=True, size=max(offset, 1))
+        self._owner = True
+        self.name = self._shared_memory.name
+        buffer = self._shared_memory.buf
+        for key, payload in serialized_scans.items():
+            offset, size = self.index[key]
+            buffer[offset:offset + size] = payload
+
+    @classmethod
+    def is_available(cls):
+        return SharedMemory is not None
+
+    def __getitem__(self, key):
+        offset, size = self.index[key]
+        return bytes(self._shared_memory.buf[offset:offset + size])
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def keys(self):
+        return self.index.keys()
+
+    def __getstate__(self):
+        return {"name": self.name, "index": self.index}
+
+    def __setstate__(self, state):
+        self.name = state['name']
+        self.index = state['index']
+        self._shared_memory = SharedMemory(name=self.name)
+        self._owner = False
+
+    def clear(self):
+        """Release the shared memory block, destroying it if this instance created it.
+        """
+        self.index = dict()
+        if self._shared_memory is None:
+            return
+        self._shared_memory.close()
+        if self._owner:
+            self._shared_memory.unlink()
+        self._shared_memory = None
+
+    def __repr__(self):
+        return "{self.__class__.__name__}({self.name!r}, {size})".format(self=self, size=len(self))
@@ -241,14 +241,10 @@ class GlycopeptideDatabaseSearchIdentifier(TaskBase):
             [x.best_solution() for x in decoy_hits], *args, with_pit=with_pit,
             grouping_functions=grouping_fns, **kwargs)
         tda.q_values()
-        for sol in target_hits:
-            for hit in sol:
-                tda.score(hit)
-            sol.q_value = sol.best_solution().q_value
-        for sol in decoy_hits:
-            for hit in sol:
-                tda.score(hit)
-            sol.q_value = sol.best_solution().q_value
+        for hits in (target_hits, decoy_hits):
+            tda.score_many([hit for sol in hits for hit in sol])
+            for sol in hits:
+                sol.q_value = sol.best_solution().q_value
         return tda
 
     def map_to_chromatograms(self, chromatograms, tandem_identifications,
@@ -324,14 +320,10 @@ class GlycopeptideDatabaseSearchComparer(GlycopeptideDatabaseSearchIdentifier):
             database_ratio=database_ratio, grouping_functions=grouping_fns, **kwargs)
 
         tda.q_values()
-        for sol in target_hits:
-            for hit in sol:
-                tda.score(hit)
-            sol.q_value = sol.best_solution().q_value
-        for sol in decoy_hits:
-            for hit in sol:
-                tda.score(hit)
-            sol.q_value = sol.best_solution().q_value
+        for hits in (target_hits, decoy_hits):
+            tda.score_many([hit for sol in hits for hit in sol])
+            for sol in hits:
+                sol.q_value = sol.best_solution().q_value
         return tda
 
     def _load_stored_matches(self, target_count, decoy_count):
@@ -356,14 +348,10 @@ class ExclusiveGlycopeptideDatabaseSearchComparer(GlycopeptideDatabaseSearchComp
         accepted_targets, accepted_decoys = self._find_best_match_for_each_scan(target_hits, decoy_hits)
         tda = super(ExclusiveGlycopeptideDatabaseSearchComparer, self).estimate_fdr(
             accepted_targets, accepted_decoys, with_pit=with_pit, *args, **kwargs)
-        for sol in target_hits:
-            for hit in sol:
-                tda.score(hit)
-            sol.q_value = sol.best_solution().q_value
-        for sol in decoy_hits:
-            for hit in sol:
-                tda.score(hit)
-            sol.q_value = sol.best_solution().q_value
+        for hits in (target_hits, decoy_hits):
+            tda.score_many([hit for sol in hits for hit in sol])
+            for sol in hits:
+                sol.q_value = sol.best_solution().q_value
         return tda
 
     def _find_best_match_for_each_scan(self, target_hits, decoy_hits):
@@ -142,3 +142,10 @@ class GlycanCompositionSignatureMatcher(GlycopeptideSpectrumMatcherBase):
     def calculate_score(self, error_tolerance=2e-5, *args, **kwargs):
         self._score = self._signature_ion_score(error_tolerance)
         return self._score
+
+
+try:
+    from glycan_profiling._c.tandem.tandem_scoring_helpers import GlycanCompositionSignatureMatcher_match
+    GlycanCompositionSignatureMatcher.match = GlycanCompositionSignatureMatcher_match
+except ImportError:
+    pass
@@ -24,6 +24,18 @@ class MassAccuracyModel(object):
         self.scale = scale
         self.mu *= self.scale
         self.sigma *= self.scale
+        self._build_penalty_table()
+
+    def _build_penalty_table(self, n_std=4, size=4096):
+        self._penalty_table = None
+        # The density must stay below 1 for the penalty to be defined at all
+        if self.sigma * sqrt2pi <= 1:
+            return
+        width = self.sigma * n_std
+        grid = np.linspace(self.mu - width, self.mu + width, size)
+        self._table_start = grid[0]
+        self._table_step = grid[1] - grid[0]
+        self._penalty_table = (-10 * np.log10(1 - gauss(grid, self.mu, self.sigma))).tolist()
 
     def _sample(self):
         return self.score(self._interval(n_std=3))
@@ -38,6 +50,32 @@ class MassAccuracyModel(object):
     def __call__(self, error):
         return self.score(error)
 
+    def penalty(self, error):
+        """Compute the precursor mass accuracy score ``-10 * log10(1 - score(error))``.
+
+        Errors within four standard deviations of the mean are linearly interpolated
+        from a table precomputed when the model is created, and all other errors are
+        computed directly.
+
+        Parameters
+        ----------
+        error : float
+            The precursor mass error, in the same units as :attr:`mu` before scaling
+
+        Returns
+        -------
+        float
+        """
+        table = self._penalty_table
+        if table is not None:
+            x = (self.scale * error - self._table_start) / self._table_step
+            if x >= 0:
+                i = int(x)
+                if i < len(table) - 1:
+                    lo = table[i]
+                    return lo + (table[i + 1] - lo) * (x - i)
+        return -10 * math.log10(1 - self.score(error))
+
     def __repr__(self):
         return "MassAccuracyModel(%e, %e)" % (self.mu / self.scale, self.sigma / self.scale)
 
@@ -47,7 +85,7 @@ class MassAccuracyMixin(object):
 
     def _precursor_mass_accuracy_score(self):
         offset, error = self.determine_precursor_offset(include_error=True)
-        mass_accuracy = -10 * math.log10(1 - self.accuracy_bias(error))
+        mass_accuracy = self.accuracy_bias.penalty(error)
         return mass_accuracy
 
 
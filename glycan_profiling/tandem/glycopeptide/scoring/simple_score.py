@@ -175,25 +175,16 @@ class SignatureAwareCoverageScorer(SimpleCoverageScorer, GlycanCompositionSignat
         if is_hcd:
             self._match_oxonium_ions(error_tolerance, masked_peaks=masked_peaks)
             self._match_stub_glycopeptides(error_tolerance, masked_peaks=masked_peaks, chemical_shift=chemical_shift)
-        # handle N-term
-        if is_hcd and not is_exd:
-            self._match_backbone_series(
-                IonSeries.b, error_tolerance, masked_peaks, HCDFragmentationStrategy, include_neutral_losses)
-        elif is_exd:
-            self._match_backbone_series(
-                IonSeries.b, error_tolerance, masked_peaks, EXDFragmentationStrategy, include_neutral_losses)
-            self._match_backbone_series(
-                IonSeries.c, error_tolerance, masked_peaks, EXDFragmentationStrategy, include_neutral_losses)
-
-        # handle C-term
-        if is_hcd and not is_exd:
-            self._match_backbone_series(
-                IonSeries.y, error_tolerance, masked_peaks, HCDFragmentationStrategy, include_neutral_losses)
-        elif is_exd:
-            self._match_backbone_series(
-                IonSeries.y, error_tolerance, masked_peaks, EXDFragmentationStrategy, include_neutral_losses)
-            self._match_backbone_series(
-                IonSeries.z, error_tolerance, masked_peaks, EXDFragmentationStrategy, include_neutral_losses)
+        # handle N-term and C-term. Without ExD, is_hcd was forced above, so the branches
+        # only need to look at is_exd
+        if is_exd:
+            for series in (IonSeries.b, IonSeries.c, IonSeries.y, IonSeries.z):
+                self._match_backbone_series(
+                    series, error_tolerance, masked_peaks, EXDFragmentationStrategy, include_neutral_losses)
+        else:
+            for series in (IonSeries.b, IonSeries.y):
+                self._match_backbone_series(
+                    series, error_tolerance, masked_peaks, HCDFragmentationStrategy, include_neutral_losses)
         return self
 
 
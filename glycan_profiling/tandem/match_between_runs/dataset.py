@@ -1,5 +1,7 @@
 from collections import defaultdict
 
+import numpy as np
+
 from glycan_profiling import serialize
 
 from glycan_profiling.chromatogram_tree import (
@@ -34,29 +36,110 @@ class MatchBetweenDataset(object):
     def _load_chromatograms(self):
         extractor = ChromatogramExtractor(
             self.scan_loader, minimum_mass=1000.0, grouping_tolerance=1.5e-5)
-        chromatograms = extractor.run()
-        for chrom in chromatograms:
-            chrom.mark = False
+        chromatograms = list(extractor.run())
         idgps = self.analysis_loader.load_identified_glycopeptides()
+        marked = self._mark_identified_chromatograms(chromatograms, idgps)
+        chromatograms = ChromatogramFilter(
+            [chrom for chrom, mark in zip(chromatograms, marked) if not mark] + list(idgps))
+        self.identified_structures = idgps
+        self.chromatograms = chromatograms
+        self._chromatogram_mass_index = None
+
+    def _build_chromatogram_mass_index(self):
+        chromatograms = list(self.chromatograms)
+        masses = np.array([chrom.weighted_neutral_mass for chrom in chromatograms], dtype=float)
+        order = np.argsort(masses, kind='mergesort')
+        self._chromatogram_mass_index = (chromatograms, masses, order, masses[order])
+        return self._chromatogram_mass_index
+
+    def _find_chromatograms_by_mass(self, mass, mass_error_tolerance=1e-5):
+        """Find all chromatograms in :attr:`chromatograms` whose weighted neutral mass is
+        within `mass_error_tolerance` of `mass`, in the order they appear in :attr:`chromatograms`.
+
+        This searches an array of chromatogram masses sorted once per change to :attr:`chromatograms`,
+        rather than building a new :class:`ChromatogramFilter` for every query like
+        :meth:`ChromatogramFilter.find_all_by_mass`.
+
+        Parameters
+        ----------
+        mass : float
+            The mass to search for
+        mass_error_tolerance : float, optional
+            The PPM error tolerance for matching masses
+
+        Returns
+        -------
+        list
+        """
+        index = self._chromatogram_mass_index
+        if index is None:
+            index = self._build_chromatogram_mass_index()
+        chromatograms, masses, order, sorted_masses = index
+        start = np.searchsorted(sorted_masses, mass * (1 - mass_error_tolerance), side='right')
+        end = np.searchsorted(sorted_masses, mass * (1 + mass_error_tolerance), side='left')
+        return [chromatograms[i] for i in np.sort(order[start:end])
+                if abs(masses[i] - mass) / mass < mass_error_tolerance]
+
+    def _mark_identified_chromatograms(self, chromatograms, idgps, mass_error_tolerance=1e-5):
+        """Find the chromatograms which match the mass of an identified glycopeptide under any
+        of its mass shifts and overlap its chromatogram in time.
+
+        The chromatogram masses are sorted once and the mass window of every identification and
+        mass shift is located in them in a single vectorized search, so only the chromatograms
+        inside each window are tested for overlap in time.
+
+        Parameters
+        ----------
+        chromatograms : list
+            The extracted chromatograms
+        idgps : list of :class:`IdentifiedGlycopeptide`
+            The identified glycopeptides
+        mass_error_tolerance : float, optional
+            The PPM error tolerance for matching masses
+
+        Returns
+        -------
+        np.ndarray:
+            A boolean mask over `chromatograms`, true for each chromatogram that was matched
+        """
+        marked = np.zeros(len(chromatograms), dtype=bool)
+        queries = []
+        query_masses = []
         for idgp in idgps:
             if idgp.chromatogram is None:
                 continue
             for mshift in idgp.mass_shifts:
-                chroma = chromatograms.find_all_by_mass(
-                    idgp.weighted_neutral_mass + mshift.mass, 1e-5)
-                for chrom in chroma:
-                    if idgp.chromatogram.overlaps_in_time(chrom):
-                        chrom.mark = True
-        chromatograms = ChromatogramFilter([chrom for chrom in chromatograms if not chrom.mark] + list(idgps))
-        self.identified_structures = idgps
-        self.chromatograms = chromatograms
+                queries.append(idgp)
+                query_masses.append(idgp.weighted_neutral_mass + mshift.mass)
+        if not queries or not chromatograms:
+            return marked
+        masses = np.array([chrom.weighted_neutral_mass for chrom in chromatograms])
+        order = np.argsort(masses, kind='mergesort')
+        sorted_masses = masses[order]
+        query_masses = np.array(query_masses)
+        starts = np.searchsorted(sorted_masses, query_masses * (1 - mass_error_tolerance), side='right')
+        ends = np.searchsorted(sorted_masses, query_masses * (1 + mass_error_tolerance), side='left')
+        for idgp, start, end in zip(queries, starts, ends):
+            for i in order[start:end]:
+                if not marked[i] and idgp.chromatogram.overlaps_in_time(chromatograms[i]):
+                    marked[i] = True
+        return marked
 
     @property
     def ms1_scoring_model(self):
         return self.analysis_loader.analysis.parameters.get('scoring_model')
 
+    def _structure_key(self, structure):
+        """Build the key used to group identifications of `structure` in :attr:`_find_by_structure`.
+
+        Glycopeptides hash and compare by formatting their full sequence on every call,
+        so the sequence is formatted once here and paired with the protein relation to
+        reproduce their equality.
+        """
+        return (str(structure), getattr(structure, 'protein_relation', None))
+
     def find(self, ids, mass_error_tolerance=1e-5, time_error_tolerance=2.0):
-        key = ids.structure
+        key = self._structure_key(ids.structure)
         out = []
         id_out = []
         ids_mass = ids.weighted_neutral_mass
@@ -72,23 +155,26 @@ class MatchBetweenDataset(object):
                         apex_time = result.tandem_solutions[0].scan_time
                     if abs(apex_time - ids_apex_time) < time_error_tolerance:
                         id_out.append((result, None))
+        # The identifications in :attr:`chromatograms` are the same objects as those in
+        # :attr:`_find_by_structure`, so membership can be tested by identity instead of
+        # by comparing structures, chromatograms and spectrum matches.
+        id_out_set = {id(result) for result, _ in id_out}
         for mshift in ids.mass_shifts:
             qmass = mshift.mass + ids_mass
-            chroma = self.chromatograms.find_all_by_mass(
+            chroma = self._find_chromatograms_by_mass(
                 qmass, mass_error_tolerance)
             for chrom in chroma:
                 if abs(chrom.apex_time - ids_apex_time) < time_error_tolerance:
-                    if not isinstance(chrom, Chromatogram) and (chrom, None) in id_out:
+                    if id(chrom) in id_out_set and not isinstance(chrom, Chromatogram):
                         continue
                     out.append((chrom, mshift))
         return id_out + out
 
     def get_identified_structure_for(self, structure):
-        key = structure
-        candidates = self._find_by_structure[key]
-        for candidate in candidates:
-            if candidate.structure == structure:
-                return candidate
+        key = self._structure_key(structure)
+        candidates = self._find_by_structure.get(key)
+        if candidates:
+            return candidates[0]
         raise KeyError("Could not locate %r (%r)" %
                         (structure, structure.protein_relation))
 
@@ -130,10 +216,11 @@ class MatchBetweenDataset(object):
             candidate.chromatogram = candidate.chromatogram.merge(chrom)
 
     def add(self, ids):
-        key = ids.structure
+        key = self._structure_key(ids.structure)
         self._find_by_structure[key].append(ids)
         self.identified_structures.append(ids)
         self.chromatograms.extend([ids])
+        self._chromatogram_mass_index = None
 
     def _protein_name_label_map(self):
         proteins = self.analysis_loader.query(serialize.Protein).all()
@@ -151,4 +238,4 @@ class MatchBetweenDataset(object):
                 pr.protein_id = name_map.get(pr.protein_id, pr.protein_id)
             except AttributeError:
                 pass
-            self._find_by_structure[(ids.structure)].append(ids)
+            self._find_by_structure[self._structure_key(ids.structure)].append(ids)
@@ -3,12 +3,11 @@ import itertools
 import math
 
 from collections import namedtuple, defaultdict
-from decimal import Decimal
+from operator import attrgetter
 
 import numpy as np
-from scipy.special import comb
+from scipy.special import bdtrc
 
-from glycopeptidepy.utils.memoize import memoize
 from glycopeptidepy.algorithm import PeptidoformGenerator, ModificationSiteAssignmentCombinator
 
 from ms_deisotope.peak_set import window_peak_set
@@ -17,16 +16,36 @@ from ms_deisotope.peak_set import window_peak_set
 MAX_MISSING_A_SCORE = 1e3
 
 
-@memoize(100000000000)
+def binomial_log_pmf(n, i, p):
+    """Compute the natural logarithm of the binomial probability mass function
+    using log-gamma terms, which remains finite for large `n`.
+    """
+    return (math.lgamma(n + 1) - math.lgamma(i + 1) - math.lgamma(n - i + 1) +
+            i * math.log(p) + (n - i) * math.log1p(-p))
+
+
 def binomial_pmf(n, i, p):
-    try:
-        return comb(n, i, exact=True) * (p ** i) * ((1 - p) ** (n - i))
-    except OverflowError:
-        dn = Decimal(n)
-        di = Decimal(i)
-        dp = Decimal(p)
-        x = math.factorial(dn) / (math.factorial(di) * math.factorial(dn - di))
-        return float(x * dp ** di * ((1 - dp) ** (dn - di)))
+    return math.exp(binomial_log_pmf(n, i, p))
+
+
+def fragment_mass_array(fragments):
+    """Pack the masses of `fragments` into an array, preserving their order.
+    """
+    return np.fromiter((frag.mass for frag in fragments), dtype=float, count=len(fragments))
+
+
+def binomial_tail_score(n, i, p):
+    """Compute the -10 * log10 of the probability of observing `i` or more successes
+    out of `n` trials with success probability `p`.
+
+    All arguments may be scalars or arrays, which are broadcast against each other.
+    Tail probabilities which underflow to zero are given a score of 1e3.
+    """
+    # bdtrc(k, n, p) is P(X > k), so shift to include the `i`th term
+    tail = bdtrc(np.subtract(i, 1), n, p)
+    with np.errstate(divide='ignore'):
+        score = np.abs(-10.0 * np.log10(tail))
+    return np.where(tail == 0.0, 1e3, score)
 
 
 class PeakWindow(object):
@@ -92,10 +111,13 @@ class ModificationAssignment(_ModificationAssignment):
 
 
 class AScoreCandidate(object):
-    def __init__(self, peptide, modifications, fragments=None):
+    def __init__(self, peptide, modifications, fragments=None, fragment_masses=None):
+        if fragment_masses is None and fragments is not None:
+            fragment_masses = fragment_mass_array(fragments)
         self.peptide = peptide
         self.modifications = modifications
         self.fragments = fragments
+        self.fragment_masses = fragment_masses
 
     def __hash__(self):
         return hash(self.peptide)
@@ -104,7 +126,9 @@ class AScoreCandidate(object):
         return self.peptide == other.peptide and self.modifications == other.modifications
 
     def make_solution(self, a_score, permutations=None):
-        return AScoreSolution(self.peptide, a_score, self.modifications, permutations, self.fragments)
+        return AScoreSolution(
+            self.peptide, a_score, self.modifications, permutations, self.fragments,
+            self.fragment_masses)
 
     def __repr__(self):
         template = "{self.__class__.__name__}({d})"
@@ -118,14 +142,14 @@ class AScoreCandidate(object):
             "%s=%s" % (k, formatvalue(v)) if v is not self else "(...)" for k, v in sorted(
                 self.__dict__.items(), key=lambda x: x[0])
             if (not k.startswith("_") and not callable(v))
-            and not (v is None) and k != "fragments"]
+            and not (v is None) and k not in ("fragments", "fragment_masses")]
 
         return template.format(self=self, d=', '.join(d))
 
 
 class AScoreSolution(AScoreCandidate):
-    def __init__(self, peptide, a_score, modifications, permutations, fragments=None):
-        super(AScoreSolution, self).__init__(peptide, modifications, fragments)
+    def __init__(self, peptide, a_score, modifications, permutations, fragments=None, fragment_masses=None):
+        super(AScoreSolution, self).__init__(peptide, modifications, fragments, fragment_masses)
         self.a_score = a_score
         self.permutations = permutations
 
@@ -223,6 +247,11 @@ class AScoreEvaluator(PeptidoformPermuter):
     def __init__(self, scan, peptide, modification_rule, modification_count=1, respect_specificity=True):
         self._scan = None
         self.peak_windows = []
+        self._peak_masses = None
+        self._peak_ranks = None
+        self._depth_match_counts = None
+        self._window_starts = None
+        self._window_upper_masses = None
 
         PeptidoformPermuter.__init__(
             self, peptide, modification_rule, modification_count, respect_specificity)
@@ -241,14 +270,47 @@ class AScoreEvaluator(PeptidoformPermuter):
             self.peak_windows = []
         else:
             self.peak_windows = list(map(PeakWindow, window_peak_set(value.deconvoluted_peak_set)))
+        self._index_peak_windows()
+
+    def _index_peak_windows(self):
+        """Flatten :attr:`peak_windows` into parallel arrays of peak masses, sorted
+        by mass, and of each peak's intensity rank within its window, along with the
+        offset at which each non-empty window starts and the mass below which a fragment
+        is assigned to that window.
+
+        Also tabulates, for each peak depth, the running count of peaks within that depth,
+        so that the peaks matched in any index range can be counted at every depth at once.
+        """
+        masses = []
+        ranks = []
+        starts = []
+        upper_masses = []
+        for window in self.peak_windows:
+            if not window:
+                continue
+            starts.append(len(masses))
+            upper_masses.append(window.max_mass + 1)
+            for rank in sorted(range(len(window)), key=lambda i: window[i].neutral_mass):
+                masses.append(window[rank].neutral_mass)
+                ranks.append(rank)
+        starts.append(len(masses))
+        self._peak_masses = np.array(masses, dtype=float)
+        self._peak_ranks = np.array(ranks, dtype=np.intp)
+        self._window_starts = np.array(starts, dtype=np.intp)
+        self._window_upper_masses = np.array(upper_masses, dtype=float)
+        max_depth = self._peak_ranks.max() + 1 if len(self._peak_ranks) else 0
+        self._depth_match_counts = np.zeros((max_depth + 1, len(masses) + 1), dtype=np.intp)
+        np.cumsum(
+            self._peak_ranks[None, :] < np.arange(max_depth + 1)[:, None],
+            axis=1, out=self._depth_match_counts[:, 1:])
 
     def _generate_fragments(self, peptidoform):
-        frags = itertools.chain.from_iterable(
-            itertools.chain(
-                peptidoform.get_fragments("y"),
-                peptidoform.get_fragments("b")))
-        frags = list(frags)
-        frags.sort(key=lambda x: x.mass)
+        # Each position yields a list of fragments, including any neutral loss variants
+        frags = []
+        for series in ("y", "b"):
+            for position in peptidoform.get_fragments(series):
+                frags.extend(position)
+        frags.sort(key=attrgetter("mass"))
         return frags
 
     def match_ions(self, fragments, depth=10, error_tolerance=1e-5):
@@ -270,20 +332,46 @@ class AScoreEvaluator(PeptidoformPermuter):
         int:
             The number of fragments matched
         '''
-        n = 0
-        window_i = 0
-        window_n = len(self.peak_windows)
-        current_window = self.peak_windows[window_i]
-        for frag in fragments:
-            while not current_window or (frag.mass >= (current_window.max_mass + 1)):
-                window_i += 1
-                if window_i == window_n:
-                    return n
-                current_window = self.peak_windows[window_i]
-            for peak in current_window[:depth]:
-                if abs(peak.neutral_mass - frag.mass) / frag.mass < error_tolerance:
-                    n += 1
-        return n
+        lo, hi = self._match_bounds(fragment_mass_array(fragments), error_tolerance)
+        return int(self._count_matches(lo, hi, depth))
+
+    def _match_bounds(self, masses, error_tolerance=1e-5):
+        '''Find the range of indices into the flattened peak arrays that
+        each fragment matches within its peak window.
+
+        Fragments are assigned to the first window whose most massive peak is
+        within 1 Da of the fragment or heavier, and fragments beyond the last
+        window are dropped.
+
+        Parameters
+        ----------
+        masses: :class:`numpy.ndarray`
+            The masses of the peptide fragments, sorted
+        error_tolerance: float
+            The PPM error tolerance to use when matching peaks.
+
+        Returns
+        -------
+        lo: :class:`numpy.ndarray`
+        hi: :class:`numpy.ndarray`
+        '''
+        window = np.searchsorted(self._window_upper_masses, masses, side='right')
+        in_window = window < len(self._window_upper_masses)
+        masses = masses[in_window]
+        window = window[in_window]
+        start = self._window_starts[window]
+        end = self._window_starts[window + 1]
+        width = masses * error_tolerance
+        lo = np.clip(np.searchsorted(self._peak_masses, masses - width, side='right'), start, end)
+        hi = np.clip(np.searchsorted(self._peak_masses, masses + width, side='left'), lo, end)
+        return lo, hi
+
+    def _count_matches(self, lo, hi, depth):
+        '''Count the peaks in the index ranges `lo` to `hi` which are among the top
+        `depth` peaks of their window. If `depth` is an array, count at each depth.
+        '''
+        counts = self._depth_match_counts[np.clip(depth, 0, len(self._depth_match_counts) - 1)]
+        return (counts[..., hi] - counts[..., lo]).sum(axis=-1)
 
     def permutation_score(self, peptidoform, error_tolerance=1e-5):
         '''Calculate the binomial statistic for this peptidoform
@@ -291,8 +379,8 @@ class AScoreEvaluator(PeptidoformPermuter):
 
         Parameters
         ----------
-        peptidoform: :class:`~.PeptideSequence`
-            The peptidoform to score
+        peptidoform: :class:`AScoreCandidate`
+            The peptidoform to score, with its fragments and their masses
         error_tolerance: float
             The PPM error tolerance to use when matching peaks.
 
@@ -306,18 +394,21 @@ class AScoreEvaluator(PeptidoformPermuter):
         :meth:`_score_at_window_depth`
         :meth:`match_ions`
         '''
-        fragments = peptidoform.fragments
-        N = len(fragments)
-        site_scores = np.zeros(10)
-        for i in range(1, 11):
-            site_scores[i - 1] = self._score_at_window_depth(
-                fragments, N, i, error_tolerance)
-        return site_scores
+        N = len(peptidoform.fragments)
+        lo, hi = self._match_bounds(peptidoform.fragment_masses, error_tolerance)
+        n = self._count_matches(lo, hi, self._depths)
+        # If a fragment matches twice, this count can exceed the theoretical maximum.
+        np.minimum(n, N, out=n)
+        return binomial_tail_score(N, n, self._depth_probabilities)
+
+    # The peak depths scored, and the probability of a random match at each
+    _depths = np.arange(1, 11)
+    _depth_probabilities = _depths / 100.0
 
     def _score_at_window_depth(self, fragments, N, i, error_tolerance=1e-5):
         '''Score a fragment collection at a given peak depth, and
-        calculate the binomial score based upon the probability mass
-        function.
+        calculate the binomial score based upon the probability of
+        matching at least as many fragments by chance.
 
         Parameters
         ----------
@@ -339,10 +430,7 @@ class AScoreEvaluator(PeptidoformPermuter):
         # If a fragment matches twice, this count can exceed the theoretical maximum.
         if n > N:
             n = N
-        cumulative_score = binomial_pmf(N, n, p)
-        if cumulative_score == 0.0:
-            return 1e3
-        return (abs(-10.0 * math.log10(cumulative_score)))
+        return float(binomial_tail_score(N, n, p))
 
     def rank_permutations(self, permutation_scores):
         """Rank generated peptidoforms by weighted sum of permutation scores
@@ -358,11 +446,12 @@ class AScoreEvaluator(PeptidoformPermuter):
         :class:`list`
             A list of :class:`tuple` instances of (weighted score, peptidoform index)
         """
-        ranking = []
-        for i, perm_scores in enumerate(permutation_scores):
-            ranking.append((self._weighted_score(perm_scores), i))
-        ranking.sort(reverse=True)
-        return ranking
+        if len(permutation_scores) == 0:
+            return []
+        weighted_scores = self._weighted_score(np.asarray(permutation_scores))
+        # Order by descending score, breaking ties by descending index
+        order = np.lexsort((-np.arange(len(weighted_scores)), -weighted_scores))
+        return [(weighted_scores[i], i) for i in order]
 
     # Taken directly from reference [1]
     _weight_vector = np.array([
@@ -375,14 +464,15 @@ class AScoreEvaluator(PeptidoformPermuter):
 
         Parameters
         ----------
-        scores : :class:`list`
-            The binomial score at each peak depth
+        scores : :class:`numpy.ndarray`
+            The binomial score at each peak depth, or a matrix with one
+            row of scores per peptidoform
 
         Returns
         -------
-        float
+        float or :class:`numpy.ndarray`
         """
-        return self._weight_vector.dot(scores) / 10.0
+        return np.dot(scores, self._weight_vector) / 10.0
 
     def score_solutions(self, error_tolerance=1e-5, peptidoforms=None):
         if peptidoforms is None:
@@ -430,8 +520,16 @@ class AScoreEvaluator(PeptidoformPermuter):
                 delta_scores.append((mod, MAX_MISSING_A_SCORE))
             peptide.a_score = delta_scores
             return peptide
+        # Several modification sites may be paired with the same alternative solution,
+        # so only score each distinct pair once.
+        delta_cache = {}
         for pair in pairs:
-            delta_score = self.calculate_delta(pair, error_tolerance=error_tolerance)
+            key = (id(pair.peptide1), id(pair.peptide2), pair.peak_depth)
+            try:
+                delta_score = delta_cache[key]
+            except KeyError:
+                delta_score = delta_cache[key] = self.calculate_delta(
+                    pair, error_tolerance=error_tolerance)
             pair.peptide1.a_score = delta_score
             delta_scores.append((pair.modifications, delta_score))
         peptide.a_score = delta_scores
@@ -455,32 +553,79 @@ class AScoreEvaluator(PeptidoformPermuter):
                 else:
                     raise ValueError("Best solution %r not in solution set")
         permutation_pairs = []
+        alt_solutions = solutions[offset:]
+        if not alt_solutions:
+            return permutation_pairs
+        # the peak depth at which the best solution most out-scores each alternative
+        peak_depths = np.argmax(
+            best_solution.permutations - np.vstack([alt.permutations for alt in alt_solutions]),
+            axis=1) + 1
         # for each modification under permutation, find the next best solution which
         # does not have this modification in its set of permuted modifications, and
         # package the pair into a :class:`ProbableSitePair`.
         for site in best_solution.modifications:
-            for alt_solution in solutions[offset:]:
+            for i, alt_solution in enumerate(alt_solutions):
                 if site not in alt_solution.modifications:
-                    peak_depth = np.argmax(best_solution.permutations - alt_solution.permutations) + 1
-                    permutation_pairs.append(ProbableSitePair(best_solution, alt_solution, site, peak_depth))
+                    permutation_pairs.append(
+                        ProbableSitePair(best_solution, alt_solution, site, peak_depths[i]))
                     break
         return permutation_pairs
 
     def site_determining_ions(self, solutions):
-        frag_sets = [set(sol.fragments) for sol in solutions]
-        common = set.intersection(*frag_sets)
+        """Find the fragments of each solution which are not shared with the solution
+        that follows it, or for the last solution, not shared with every other solution.
+
+        Fragments are shared when they have the same name and their masses are within
+        1e-5 Da of each other, as in fragment equality.
+
+        Parameters
+        ----------
+        solutions : list
+            The :class:`AScoreCandidate` instances to compare, with fragments sorted by mass
+
+        Returns
+        -------
+        :class:`list` of :class:`list`
+            The site determining fragments of each solution, sorted by mass
+        """
         n = len(solutions)
         site_determining = []
-        for i, _solution in enumerate(solutions):
-            cur_frags = frag_sets[i]
+        for i, solution in enumerate(solutions):
             if i == n - 1:
-                diff = cur_frags - common
-                site_determining.append(sorted(diff, key=lambda x: x.mass))
+                shared = np.ones(len(solution.fragments), dtype=bool)
+                for other in solutions[:i]:
+                    shared &= self._shared_fragments(solution, other)
             else:
-                diff = cur_frags - common - frag_sets[i + 1]
-                site_determining.append(sorted(diff, key=lambda x: x.mass))
+                shared = self._shared_fragments(solution, solutions[i + 1])
+            fragments = solution.fragments
+            site_determining.append([fragments[j] for j in np.flatnonzero(~shared)])
         return site_determining
 
+    @staticmethod
+    def _shared_fragments(solution, other, tolerance=1e-5):
+        """Mark which fragments of `solution` also occur in `other`, using
+        a binary search over the mass-sorted fragments of `other`.
+
+        Returns
+        -------
+        :class:`numpy.ndarray` of :class:`bool`
+        """
+        masses = solution.fragment_masses
+        other_masses = other.fragment_masses
+        lo = np.searchsorted(other_masses, masses - tolerance, side='right')
+        hi = np.searchsorted(other_masses, masses + tolerance, side='left')
+        shared = hi > lo
+        fragments = solution.fragments
+        other_fragments = other.fragments
+        for i in np.flatnonzero(shared):
+            name = fragments[i].name
+            for j in range(lo[i], hi[i]):
+                if other_fragments[j].name == name:
+                    break
+            else:
+                shared[i] = False
+        return shared
+
     def calculate_delta(self, candidate_pair, error_tolerance=1e-5):
         if candidate_pair.peptide1 == candidate_pair.peptide2:
             return 0.0
@@ -1,6 +1,10 @@
 '''Represent collections of :class:`~SpectrumMatch` instances covering the same
 spectrum, and methods for selecting which are worth keeping for downstream consideration.
 '''
+import itertools
+
+import numpy as np
+
 from .spectrum_match import SpectrumMatch, SpectrumReference, ScanWrapperBase, MultiScoreSpectrumMatch
 
 
@@ -51,11 +55,8 @@ class MinimumScoreRetentionStrategy(SpectrumMatchRetentionStrategyBase):
     list
     """
     def filter_matches(self, solution_set):
-        retain = []
-        for match in solution_set:
-            if match.score > self.threshold:
-                retain.append(match)
-        return retain
+        threshold = self.threshold
+        return [match for match in solution_set if match.score > threshold]
 
 
 class MinimumMultiScoreRetentionStrategy(SpectrumMatchRetentionStrategyBase):
@@ -98,7 +99,7 @@ class MaximumSolutionCountRetentionStrategy(SpectrumMatchRetentionStrategyBase):
     -------
     list
     """
-    def group_solutions(self, solutions, threshold=1e-2):
+    def group_solutions(self, solutions, threshold=1e-2, max_groups=None):
         """Group solutions which have scores that are very close to one-another
         so that they are not arbitrarily truncated.
 
@@ -109,6 +110,8 @@ class MaximumSolutionCountRetentionStrategy(SpectrumMatchRetentionStrategyBase):
         threshold : float, optional
             The maxmimum distance between two scores to still be considered
             part of a group (the default is 1e-2)
+        max_groups : int, optional
+            If given, stop once this many groups have been completed.
 
         Returns
         -------
@@ -119,10 +122,12 @@ class MaximumSolutionCountRetentionStrategy(SpectrumMatchRetentionStrategyBase):
             return groups
         current_group = [solutions[0]]
         last_solution = solutions[0]
-        for solution in solutions[1:]:
+        for solution in itertools.islice(solutions, 1, None):
             delta = abs(solution.score - last_solution.score)
             if delta > threshold:
                 groups.append(current_group)
+                if max_groups is not None and len(groups) >= max_groups:
+                    return groups
                 current_group = [solution]
             else:
                 current_group.append(solution)
@@ -131,8 +136,8 @@ class MaximumSolutionCountRetentionStrategy(SpectrumMatchRetentionStrategyBase):
         return groups
 
     def filter_matches(self, solution_set):
-        groups = self.group_solutions(solution_set)
-        return [b for a in groups[:self.threshold] for b in a]
+        groups = self.group_solutions(solution_set, max_groups=self.threshold)
+        return list(itertools.chain.from_iterable(groups[:self.threshold]))
 
 
 class TopScoringSolutionsRetentionStrategy(SpectrumMatchRetentionStrategyBase):
@@ -156,11 +161,9 @@ class TopScoringSolutionsRetentionStrategy(SpectrumMatchRetentionStrategyBase):
         if len(solution_set) == 0:
             return solution_set
         best_score = solution_set[0].score
-        retain = []
-        for solution in solution_set:
-            if (best_score - solution.score) < self.threshold:
-                retain.append(solution)
-        return retain
+        threshold = self.threshold
+        return [solution for solution in solution_set
+                if (best_score - solution.score) < threshold]
 
 
 class QValueRetentionStrategy(SpectrumMatchRetentionStrategyBase):
@@ -177,11 +180,8 @@ class QValueRetentionStrategy(SpectrumMatchRetentionStrategyBase):
     list
     """
     def filter_matches(self, solution_set):
-        retain = []
-        for match in solution_set:
-            if match.q_value < self.threshold:
-                retain.append(match)
-        return retain
+        threshold = self.threshold
+        return [match for match in solution_set if match.q_value < threshold]
 
 
 class SpectrumMatchRetentionMethod(SpectrumMatchRetentionStrategyBase):
@@ -205,6 +205,10 @@ class SpectrumMatchRetentionMethod(SpectrumMatchRetentionStrategyBase):
     def filter_matches(self, solution_set):
         retained = list(solution_set)
         for strategy in self.strategies:
+            # Strategies only ever remove matches, so once none are left there is
+            # nothing for the remaining strategies to do.
+            if not retained:
+                break
             retained = strategy(retained)
         return retained
 
@@ -241,6 +245,9 @@ class SpectrumSolutionSet(ScanWrapperBase):
     score: float
         The best match's score
     """
+    __slots__ = ('scan', 'solutions', '_is_sorted', '_is_simplified', '_is_top_only',
+                 '_target_map', '_q_value', '_best')
+
     spectrum_match_type = SpectrumMatch
     default_selection_method = default_selection_method
 
@@ -250,6 +257,7 @@ class SpectrumSolutionSet(ScanWrapperBase):
         self.scan = scan
         self.solutions = solutions
         self._is_sorted = False
+        self._best = None
         self._is_simplified = False
         self._is_top_only = False
         self._target_map = None
@@ -268,6 +276,11 @@ class SpectrumSolutionSet(ScanWrapperBase):
     def _invalidate(self):
         self._target_map = None
         self._is_sorted = False
+        self._best = None
+
+    @staticmethod
+    def _sort_key(solution):
+        return (solution.score, solution.target.id)
 
     @property
     def score(self):
@@ -295,6 +308,9 @@ class SpectrumSolutionSet(ScanWrapperBase):
     def q_value(self, value):
         self._q_value = value
 
+    # The number of solutions above which :meth:`solution_for` builds a lookup table
+    _target_map_threshold = 64
+
     def _make_target_map(self):
         self._target_map = {
             sol.target: sol for sol in self
@@ -313,6 +329,16 @@ class SpectrumSolutionSet(ScanWrapperBase):
         -------
         :class:`~.SpectrumMatchBase`
         """
+        if len(self.solutions) <= self._target_map_threshold:
+            # Hashing a structure is more expensive than scanning a short list,
+            # and the query is usually the very same object as the match's target.
+            for sol in self.solutions:
+                if sol.target is target:
+                    return sol
+            for sol in self.solutions:
+                if sol.target == target:
+                    return sol
+            raise KeyError(target)
         if self._target_map is None:
             self._make_target_map()
         return self._target_map[target]
@@ -330,14 +356,17 @@ class SpectrumSolutionSet(ScanWrapperBase):
         """The :class:`SpectrumMatchBase` in :attr:`solutions` which
         is the best match to :attr:`scan`, the match at position 0.
 
-        If the collection is not sorted, :meth:`sort` will be called.
+        If the collection is not sorted, the match that :meth:`sort` would
+        place first is found and cached without sorting.
 
         Returns
         -------
         :class:`~.SpectrumMatchBase`
         """
-        if not self._is_sorted:
-            self.sort()
+        if not self._is_sorted and self.solutions:
+            if self._best is None:
+                self._best = max(self.solutions, key=self._sort_key)
+            return self._best
         return self.solutions[0]
 
     def __repr__(self):
@@ -370,6 +399,9 @@ class SpectrumSolutionSet(ScanWrapperBase):
             self.scan.id, self.scan.precursor_information)
         solutions = []
         if len(self) > 0:
+            # Callers read the simplified matches in order, so sort them first
+            if not self._is_sorted:
+                self.sort()
             best_score = self.best_solution().score
             for sol in self.solutions:
                 sm = self.spectrum_match_type.from_match_solution(sol)
@@ -379,7 +411,10 @@ class SpectrumSolutionSet(ScanWrapperBase):
                 solutions.append(sm)
             self.solutions = solutions
         self._is_simplified = True
+        # The simplified matches keep the order and scores of the originals
+        is_sorted = self._is_sorted
         self._invalidate()
+        self._is_sorted = is_sorted
 
     def get_top_solutions(self, d=3):
         """Get all matches within `d` of the best solution
@@ -393,7 +428,10 @@ class SpectrumSolutionSet(ScanWrapperBase):
         Returns
         -------
         list
+            The matches, in the order :meth:`sort` gives if the set was not sorted
         """
+        if not self._is_sorted:
+            self.sort()
         best_score = self.best_solution().score
         return [x for x in self.solutions if (best_score - x.score) < d]
 
@@ -446,10 +484,40 @@ class SpectrumSolutionSet(ScanWrapperBase):
         sort_by
         sort_q_value
         """
-        self.solutions.sort(key=lambda x: (x.score, x.target.id), reverse=maximize)
+        order = None
+        if len(self.solutions) >= self._array_sort_threshold:
+            order = self._array_sort_order(maximize)
+        if order is not None:
+            solutions = self.solutions
+            self.solutions = [solutions[i] for i in order]
+        else:
+            self.solutions.sort(key=self._sort_key, reverse=maximize)
         self._is_sorted = True
         return self
 
+    # The number of solutions above which sorting through NumPy beats :meth:`list.sort`
+    _array_sort_threshold = 256
+
+    def _array_sort_order(self, maximize=True):
+        """Compute the permutation of :attr:`solutions` that :meth:`sort` would produce
+        from packed score and target id arrays, using a stable :func:`numpy.lexsort`.
+
+        Returns
+        -------
+        list or :const:`None`
+            The sorted order, or :const:`None` if the target ids are not integers
+        """
+        n = len(self.solutions)
+        try:
+            ids = np.fromiter((sol.target.id for sol in self.solutions), dtype=np.int64, count=n)
+        except (TypeError, ValueError, OverflowError, AttributeError):
+            return None
+        scores = np.fromiter((sol.score for sol in self.solutions), dtype=float, count=n)
+        if maximize:
+            ids = -ids
+            scores = -scores
+        return np.lexsort((ids, scores)).tolist()
+
     def sort_by(self, sort_fn=None, maximize=True):
         """Sort the spectrum matches in this solution set according to `sort_fn`.
 
@@ -513,6 +581,18 @@ class SpectrumSolutionSet(ScanWrapperBase):
         dup._is_sorted = self._is_sorted
         return dup
 
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in SpectrumSolutionSet.__slots__}
+
+    def __setstate__(self, state):
+        # Sets pickled before this class used __slots__ carry their instance __dict__,
+        # which lacks the attributes added since.
+        self._best = None
+        self._target_map = None
+        self._q_value = None
+        for name, value in state.items():
+            setattr(self, name, value)
+
     def __eq__(self, other):
         if self.scan.id != other.scan.id:
             return False
@@ -523,12 +603,18 @@ class SpectrumSolutionSet(ScanWrapperBase):
 
 
 class MultiScoreSpectrumSolutionSet(SpectrumSolutionSet):
+    __slots__ = ()
+
     spectrum_match_type = MultiScoreSpectrumMatch
     default_selection_method = default_multiscore_selection_method
 
     def is_multiscore(self):
         return True
 
+    @staticmethod
+    def _sort_key(solution):
+        return (solution.score_set, solution.target.id)
+
     # note: Sorting by total score is not guaranteed to sort by total
     # FDR, so a post-FDR estimation re-ranking of spectrum matches will
     # be necessary.
@@ -547,8 +633,7 @@ class MultiScoreSpectrumSolutionSet(SpectrumSolutionSet):
         sort_by
         sort_q_value
         """
-        self.solutions.sort(key=lambda x: (
-            x.score_set, x.target.id), reverse=maximize)
+        self.solutions.sort(key=self._sort_key, reverse=maximize)
         self._is_sorted = True
         return self
 
@@ -590,3 +675,10 @@ class MultiScoreSpectrumSolutionSet(SpectrumSolutionSet):
         FDRSet
         """
         return self.best_solution().q_value_set
+
+
+try:
+    from glycan_profiling._c.tandem.spectrum_match import MinimumMultiScoreRetentionStrategy_filter_matches
+    MinimumMultiScoreRetentionStrategy.filter_matches = MinimumMultiScoreRetentionStrategy_filter_matches
+except ImportError:
+    pass
@@ -408,6 +408,31 @@ class SpectrumMatch(SpectrumMatchBase):
         self.q_value = q_value
         self.id = id
 
+    @classmethod
+    def _create(cls, scan, target, score, mass_shift=None):
+        """Construct a match with default annotations, assigning its slots
+        directly rather than going through the :meth:`__init__` chain.
+
+        This is used when storing search results, where one match is created
+        per scored structure-spectrum pair.
+
+        Returns
+        -------
+        :class:`SpectrumMatch`
+        """
+        if mass_shift is None:
+            mass_shift = Unmodified
+        inst = cls.__new__(cls)
+        inst.scan = scan
+        inst.target = target
+        inst._mass_shift = mass_shift
+        inst.score = score
+        inst.best_match = False
+        inst.data_bundle = None
+        inst.q_value = None
+        inst.id = None
+        return inst
+
     def is_multiscore(self):
         """Check whether this match has been produced by summarizing a multi-score
         match, rather than a single score match.
@@ -623,6 +648,9 @@ class ScoreSet(_ScoreSet):
     def from_spectrum_matcher(cls, match):
         return cls(match.score, match.peptide_score(), match.glycan_score(), match.glycan_coverage())
 
+    def copy(self):
+        return self.__class__(*self)
+
     def pack(self):
         return self.packer.pack(*self)
 
@@ -635,6 +663,9 @@ class FDRSet(make_struct("FDRSet", ['total_q_value', 'peptide_q_value', 'glycan_
     __slots__ = ()
     packer = struct.Struct("!ffff")
 
+    def copy(self):
+        return self.__class__(*self)
+
     def pack(self):
         return self.packer.pack(*self)
 
@@ -694,16 +725,50 @@ class MultiScoreSpectrumMatch(SpectrumMatch):
                  q_value_set=None, id=None, mass_shift=None, match_type=None):
         if q_value_set is None:
             q_value_set = FDRSet.default()
+        elif isinstance(q_value_set, FDRSet):
+            q_value_set = q_value_set.copy()
         else:
             q_value_set = FDRSet(*q_value_set)
         self._q_value_set = None
         super(MultiScoreSpectrumMatch, self).__init__(
             scan, target, score_set[0], best_match, data_bundle, q_value_set[0],
             id, mass_shift)
-        self.score_set = ScoreSet(*score_set)
+        if isinstance(score_set, ScoreSet):
+            self.score_set = score_set.copy()
+        else:
+            self.score_set = ScoreSet(*score_set)
         self.q_value_set = q_value_set
         self.match_type = SpectrumMatchClassification[match_type]
 
+    @classmethod
+    def _create(cls, scan, target, score_set, mass_shift=None):
+        """Construct a match with default annotations, assigning its slots
+        directly rather than going through the :meth:`__init__` chain.
+
+        Unlike :meth:`__init__`, `score_set` must already be a :class:`ScoreSet`,
+        and it is stored as-is rather than copied.
+
+        Returns
+        -------
+        :class:`MultiScoreSpectrumMatch`
+        """
+        if mass_shift is None:
+            mass_shift = Unmodified
+        q_value_set = FDRSet.default()
+        inst = cls.__new__(cls)
+        inst.scan = scan
+        inst.target = target
+        inst._mass_shift = mass_shift
+        inst.score = score_set[0]
+        inst.best_match = False
+        inst.data_bundle = None
+        inst.id = None
+        inst.score_set = score_set
+        inst._q_value_set = q_value_set
+        inst.q_value = q_value_set.total_q_value
+        inst.match_type = SpectrumMatchClassification[None]
+        return inst
+
     def is_multiscore(self):
         return True
 
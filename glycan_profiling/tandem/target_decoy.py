@@ -6,9 +6,10 @@ except Exception:
     pass
 import math
 
-from collections import defaultdict, namedtuple
+from collections import namedtuple
 
 import numpy as np
+from scipy.special import gammaln, betainc
 try:
     from matplotlib import pyplot as plt
 except (ImportError, RuntimeError):
@@ -30,6 +31,30 @@ class NearestValueLookUp(object):
         if isinstance(items, dict):
             items = items.items()
         self.items = sorted([ScoreCell(*x) for x in items if not np.isnan(x[0])], key=lambda x: x[0])
+        self._scores = np.array([cell[0] for cell in self.items], dtype=float)
+        self._values = np.array([cell[1] for cell in self.items], dtype=float)
+
+    @classmethod
+    def from_sorted(cls, scores, values):
+        """Build a lookup from parallel arrays of keys and values, where `scores`
+        is already sorted in increasing order and contains no NaN.
+
+        Parameters
+        ----------
+        scores : :class:`np.ndarray`
+            The sorted keys
+        values : :class:`np.ndarray`
+            The value for each key
+
+        Returns
+        -------
+        NearestValueLookUp
+        """
+        self = cls.__new__(cls)
+        self._scores = np.array(scores, dtype=float)
+        self._values = np.array(values, dtype=float)
+        self.items = [ScoreCell(*x) for x in zip(self._scores.tolist(), self._values.tolist())]
+        return self
 
     def max_key(self):
         try:
@@ -124,9 +149,35 @@ class NearestValueLookUp(object):
         return self._get_one(key)
 
     def _get_sequence(self, key):
-        value = [self._get_one(k) for k in key]
-        if isinstance(key, np.ndarray):
-            value = np.array(value, dtype=float)
+        """Look up the values nearest to each of the keys in `key`
+        in a single vectorized search.
+
+        Parameters
+        ----------
+        key : :class:`~.Iterable` of :class:`float`
+            The keys to look up
+
+        Returns
+        -------
+        list or :class:`np.ndarray`
+            A :class:`np.ndarray` if `key` was one, otherwise a :class:`list`
+        """
+        n = len(self.items)
+        if n == 0:
+            raise IndexError(0)
+        keys = np.asarray(key, dtype=float)
+        scores = self._scores
+        values = self._values
+        if n == 1:
+            indices = np.zeros(keys.shape, dtype=np.intp)
+        else:
+            indices = np.clip(np.searchsorted(scores, keys), 1, n - 1)
+            # Step back to the lower neighbor when it is at least as close
+            indices -= (keys - scores[indices - 1]) <= (scores[indices] - keys)
+            indices[np.isnan(keys)] = 0
+        value = values[indices]
+        if not isinstance(key, np.ndarray):
+            value = value.tolist()
         return value
 
     def _get_one(self, key):
@@ -147,59 +198,33 @@ except ImportError:
 
 
 class ScoreThresholdCounter(object):
-    def __init__(self, series, thresholds):
-        self.series = sorted(series, key=lambda x: x.score)
-        self.thresholds = sorted(set(np.round((thresholds), 10)))
-        self.counter = defaultdict(int)
-        self.counts_above_threshold = None
-        self.n_thresholds = len(self.thresholds)
-        self.threshold_index = 0
-        self.current_threshold = self.thresholds[self.threshold_index]
-        self.current_count = 0
-
-        self._i = 0
-        self._is_done = False
-
-        self.find_counts()
-        self.counts_above_threshold = self.compute_complement()
-        self.counter = NearestValueLookUp(self.counter)
-
-    def advance_threshold(self):
-        self.threshold_index += 1
-        if self.threshold_index < self.n_thresholds:
-            self.current_threshold = self.thresholds[self.threshold_index]
-            self.counter[self.current_threshold] = self.current_count
-            return True
-        else:
-            self._is_done = True
-            return False
-
-    def test(self, item):
-        if item.score < self.current_threshold:
-            self.current_count += 1
-            self._i += 1
-        else:
-            # Rather than using recursion, just invert the condition
-            # being tested and loop here.
-            while self.advance_threshold():
-                if item.score > self.current_threshold:
-                    continue
-                else:
-                    self.current_count += 1
-                    self._i += 1
-                    break
+    """Count the number of items in `series` scoring below and at or above
+    each of `thresholds`.
 
-    def find_counts(self):
-        for item in self.series:
-            self.test(item)
+    `series` may be a sequence of objects with a ``score`` attribute, or an
+    array of the scores themselves.
 
-    def compute_complement(self):
-        complement = defaultdict(int)
-        n = len(self.series)
-
-        for k, v in self.counter.items():
-            complement[k] = n - v
-        return NearestValueLookUp(complement)
+    Attributes
+    ----------
+    thresholds : list
+        The distinct, sorted score thresholds
+    counter : :class:`NearestValueLookUp`
+        The number of items scoring strictly below each threshold
+    counts_above_threshold : :class:`NearestValueLookUp`
+        The number of items scoring at or above each threshold
+    """
+    def __init__(self, series, thresholds):
+        thresholds = np.unique(np.round(np.asarray(thresholds, dtype=float), 10))
+        self.thresholds = thresholds.tolist()
+        if isinstance(series, np.ndarray):
+            scores = np.sort(series)
+        else:
+            scores = np.fromiter((x.score for x in series), dtype=float, count=len(series))
+            scores.sort()
+        below = np.searchsorted(scores, thresholds, side='left')
+        above = len(scores) - below
+        self.counter = NearestValueLookUp.from_sorted(thresholds, below)
+        self.counts_above_threshold = NearestValueLookUp.from_sorted(thresholds, above)
 
 
 class TargetDecoySet(namedtuple("TargetDecoySet", ['target_matches', 'decoy_matches'])):
@@ -211,21 +236,12 @@ class TargetDecoySet(namedtuple("TargetDecoySet", ['target_matches', 'decoy_matc
 
 
 # implementation derived from pyteomics
-_precalc_fact = np.log([math.factorial(n) for n in range(20)])
-
-
 def log_factorial(x):
-    x = np.array(x)
-    m = (x >= _precalc_fact.size)
-    out = np.empty(x.shape)
-    out[~m] = _precalc_fact[x[~m].astype(int)]
-    x = x[m]
-    out[m] = x * np.log(x) - x + 0.5 * np.log(2 * np.pi * x)
-    return out
+    return gammaln(np.asarray(x, dtype=float) + 1.0)
 
 
 def _log_pi_r(d, k, p=0.5):
-    return k * math.log(p) + log_factorial(k + d) - log_factorial(k) - log_factorial(d)
+    return k * math.log(p) + gammaln(k + d + 1.0) - gammaln(k + 1.0) - gammaln(d + 1.0)
 
 
 def _log_pi(d, k, p=0.5):
@@ -261,9 +277,12 @@ def _expectation(d, t, p=0.5):
     if t is None:
         return d + 1
     t = int(t)
-    m = np.arange(t + 1, dtype=int)
-    pi = np.exp(_log_pi(d, m, p))
-    return ((m * pi).cumsum() / pi.cumsum())[t]
+    if t == 0:
+        return 0.0
+    # The truncated first moment of the negative binomial is a rescaled negative binomial
+    # CDF with one more failure, so both sums reduce to regularized incomplete beta functions.
+    q = 1. - p
+    return (d + 1) * p / q * betainc(d + 2, t, q) / betainc(d + 1, t + 1, q)
 
 
 def expectation_correction(targets, decoys, ratio):
@@ -331,6 +350,8 @@ class TargetDecoyAnalyzer(object):
         Whether or not to use the "percent incorrect target" adjustment
     """
 
+    _max_decoy_score = None
+
     def __init__(self, target_series, decoy_series, with_pit=False, decoy_correction=0, database_ratio=1.0,
                  target_weight=1.0, decoy_pseudocount=1.0):
         self.targets = target_series
@@ -357,18 +378,29 @@ class TargetDecoyAnalyzer(object):
         target_series = self.targets
         decoy_series = self.decoys
 
-        thresholds = np.array(sorted({case.score for case in target_series} |
-                                     {case.score for case in decoy_series}), dtype=float)
+        target_scores = np.fromiter(
+            (case.score for case in target_series), dtype=float, count=len(target_series))
+        decoy_scores = np.fromiter(
+            (case.score for case in decoy_series), dtype=float, count=len(decoy_series))
+        thresholds = np.unique(np.concatenate([target_scores, decoy_scores]))
         self.thresholds = thresholds
+        # The decoy counter has an entry for every threshold, including target scores
+        # above the best decoy, so its largest key cannot be used to detect those.
+        self._max_decoy_score = decoy_scores.max() if len(decoy_scores) else -float('inf')
         if len(thresholds) > 0:
             self.n_targets_at = ScoreThresholdCounter(
-                target_series, self.thresholds).counts_above_threshold
+                target_scores, self.thresholds).counts_above_threshold
             self.n_decoys_at = ScoreThresholdCounter(
-                decoy_series, self.thresholds).counts_above_threshold
+                decoy_scores, self.thresholds).counts_above_threshold
+
+    def _decoy_score_bound(self):
+        if self._max_decoy_score is None:
+            return self.n_decoys_at.max_key()
+        return self._max_decoy_score
 
     def n_decoys_above_threshold(self, threshold):
         try:
-            if threshold > self.n_decoys_at.max_key():
+            if threshold > self._decoy_score_bound():
                 return self.decoy_pseudocount + self.decoy_correction
             return self.n_decoys_at[threshold] + self.decoy_correction
         except IndexError:
@@ -390,11 +422,14 @@ class TargetDecoyAnalyzer(object):
         return expectation_correction(t, d, self.database_ratio)
 
     def target_decoy_ratio(self, cutoff):
-
         decoys_at = self.n_decoys_above_threshold(cutoff)
         targets_at = self.n_targets_above_threshold(cutoff)
+        return self._target_decoy_ratio(targets_at, decoys_at)
+
+    def _target_decoy_ratio(self, targets_at, decoys_at):
         decoy_correction = 0
-        if self.decoy_correction:
+        # With no targets retained the expected number of incorrect targets is zero
+        if self.decoy_correction and targets_at:
             try:
                 decoy_correction = self.expectation_correction(targets_at, decoys_at)
             except Exception as ex:
@@ -407,27 +442,57 @@ class TargetDecoyAnalyzer(object):
         return ratio, targets_at, decoys_at
 
     def estimate_percent_incorrect_targets(self, cutoff):
-        target_cut = self.target_count - self.n_targets_above_threshold(cutoff)
-        decoy_cut = self.decoy_count - self.n_decoys_above_threshold(cutoff)
+        return self._estimate_percent_incorrect_targets(
+            self.n_targets_above_threshold(cutoff), self.n_decoys_above_threshold(cutoff))
+
+    def _estimate_percent_incorrect_targets(self, targets_at, decoys_at):
+        target_cut = self.target_count - targets_at
+        decoy_cut = self.decoy_count - decoys_at
+        if target_cut == 0 and decoy_cut > 0:
+            # No targets score below the cutoff, so there is nothing to estimate the
+            # proportion from. A zero here would carry through every q-value.
+            return 1.0
         percent_incorrect_targets = target_cut / float(decoy_cut)
 
         return percent_incorrect_targets
 
     def estimate_fdr(self, cutoff):
+        return self._estimate_fdr(
+            self.n_targets_above_threshold(cutoff), self.n_decoys_above_threshold(cutoff))
+
+    def _estimate_fdr(self, targets_at, decoys_at):
         if self.with_pit:
-            percent_incorrect_targets = self.estimate_percent_incorrect_targets(cutoff)
+            percent_incorrect_targets = self._estimate_percent_incorrect_targets(targets_at, decoys_at)
         else:
             percent_incorrect_targets = 1.0
-        return percent_incorrect_targets * self.target_decoy_ratio(cutoff)[0]
+        return percent_incorrect_targets * self._target_decoy_ratio(targets_at, decoys_at)[0]
+
+    def _counts_above_thresholds(self, thresholds):
+        """Batched equivalent of :meth:`n_targets_above_threshold` and
+        :meth:`n_decoys_above_threshold` over an array of thresholds.
+
+        Returns
+        -------
+        targets_at : list
+        decoys_at : list
+        """
+        targets_at = self.n_targets_at._get_sequence(thresholds)
+        decoys_at = self.n_decoys_at._get_sequence(thresholds)
+        decoys_at[thresholds > self._decoy_score_bound()] = self.decoy_pseudocount
+        decoys_at += self.decoy_correction
+        return targets_at.tolist(), decoys_at.tolist()
 
     def calculate_q_values(self):
-        thresholds = sorted(self.thresholds, reverse=False)
+        thresholds = np.sort(self.thresholds)
         mapping = {}
+        if len(thresholds) == 0:
+            return NearestValueLookUp(mapping)
         last_score = float('inf')
         last_q_value = 0
-        for threshold in thresholds:
+        targets_at, decoys_at = self._counts_above_thresholds(thresholds)
+        for threshold, t, d in zip(thresholds.tolist(), targets_at, decoys_at):
             try:
-                q_value = self.estimate_fdr(threshold)
+                q_value = self._estimate_fdr(t, d)
                 # If a worse score has a lower q-value than a better score, use that q-value
                 # instead.
                 if last_q_value < q_value and last_score < threshold:
@@ -514,16 +579,8 @@ class TargetDecoyAnalyzer(object):
             for decoy in self.decoys:
                 decoy.q_value = 0.0
             return
-        for target in self.targets:
-            try:
-                target.q_value = q_map[target.score]
-            except IndexError:
-                target.q_value = 0.0
-        for decoy in self.decoys:
-            try:
-                decoy.q_value = q_map[decoy.score]
-            except IndexError:
-                decoy.q_value = 0.0
+        self.score_many(self.targets)
+        self.score_many(self.decoys)
 
     def score(self, spectrum_match):
         try:
@@ -534,6 +591,34 @@ class TargetDecoyAnalyzer(object):
             spectrum_match.q_value = 0.0
         return spectrum_match
 
+    def score_many(self, spectrum_matches):
+        """Assign q-values to all of `spectrum_matches` with a single batched
+        lookup, as :meth:`score` does for one match.
+
+        Parameters
+        ----------
+        spectrum_matches : :class:`~.Sequence` of :class:`~.SpectrumMatch`
+            The matches to assign q-values to
+
+        Returns
+        -------
+        :class:`~.Sequence` of :class:`~.SpectrumMatch`
+        """
+        if len(self._q_value_map) == 0:
+            if spectrum_matches:
+                import warnings
+                warnings.warn("Empty q-value mapping. q-value will be 0.")
+            for spectrum_match in spectrum_matches:
+                spectrum_match.q_value = 0.0
+            return spectrum_matches
+        scores = np.fromiter(
+            (spectrum_match.score for spectrum_match in spectrum_matches),
+            dtype=float, count=len(spectrum_matches))
+        q_values = self._q_value_map._get_sequence(scores).tolist()
+        for spectrum_match, q_value in zip(spectrum_matches, q_values):
+            spectrum_match.q_value = q_value
+        return spectrum_matches
+
     @property
     def q_value_map(self):
         return self._q_value_map
@@ -606,3 +691,11 @@ class GroupwiseTargetDecoyAnalyzer(object):
         i = self.find_group(spectrum_match)
         fit = self.group_fits[i]
         return fit.score(spectrum_match)
+
+    def score_many(self, spectrum_matches):
+        groups = [[] for fit in self.group_fits]
+        for spectrum_match in spectrum_matches:
+            groups[self.find_group(spectrum_match)].append(spectrum_match)
+        for fit, group in zip(self.group_fits, groups):
+            fit.score_many(group)
+        return spectrum_matches
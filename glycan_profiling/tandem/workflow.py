@@ -240,14 +240,10 @@ class ExclusiveDatabaseSearchComparerBase(DatabaseSearchComparerBase):
         accepted_targets, accepted_decoys = self._find_best_match_for_each_scan(target_hits, decoy_hits)
         tda = super(ExclusiveDatabaseSearchComparerBase, self).target_decoy(
             accepted_targets, accepted_decoys, with_pit=with_pit, *args, **kwargs)
-        for sol in target_hits:
-            for hit in sol:
-                tda.score(hit)
-            sol.q_value = sol.best_solution().q_value
-        for sol in decoy_hits:
-            for hit in sol:
-                tda.score(hit)
-            sol.q_value = sol.best_solution().q_value
+        for hits in (target_hits, decoy_hits):
+            tda.score_many([hit for sol in hits for hit in sol])
+            for sol in hits:
+                sol.q_value = sol.best_solution().q_value
         return tda
 
     def _find_best_match_for_each_scan(self, target_hits, decoy_hits):
@@ -0,0 +1,285 @@
+import random
+import unittest
+
+from ms_deisotope.peak_dependency_network.intervals import SpanningMixin
+
+from glycan_profiling.database import intervals
+
+
+class _Interval(SpanningMixin):
+    def __init__(self, start, end, size=1):
+        self.start = start
+        self.end = end
+        self.center = (start + end) / 2.
+        self.size = size
+
+    def copy(self):
+        return _Interval(self.start, self.end, self.size)
+
+    def extend(self, other):
+        self.start = min(self.start, other.start)
+        self.end = max(self.end, other.end)
+        self.center = (self.start + self.end) / 2.
+        self.size += other.size
+        return self
+
+    def __repr__(self):
+        return "_Interval(%r, %r)" % (self.start, self.end)
+
+
+class _ReferenceLRUIntervalSet(object):
+    """The list-scanning :class:`~.LRUIntervalSet`, with a recency list ordered by
+    identity, from before the interval set cached its centers and threaded its
+    recency links through the intervals.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.intervals = []
+        self.lru = []
+        self.current_size = 0
+
+    def __getitem__(self, i):
+        return self.intervals[i]
+
+    def __len__(self):
+        return len(self.intervals)
+
+    def _touch(self, interval):
+        self._forget(interval)
+        self.lru.insert(0, interval)
+
+    def _forget(self, interval):
+        self.lru = [x for x in self.lru if x is not interval]
+
+    def find_insertion_point(self, mass):
+        lo = 0
+        hi = len(self)
+        if hi == 0:
+            return 0, False
+        while hi != lo:
+            mid = (hi + lo) // 2
+            x = self[mid]
+            err = x.center - mass
+            if abs(err) <= 1e-9:
+                return mid, True
+            elif (hi - lo) == 1:
+                return mid, False
+            elif err > 0:
+                hi = mid
+            else:
+                lo = mid
+
+    def find_interval(self, query):
+        lo = 0
+        n = hi = len(self)
+        match = None
+        while hi != lo:
+            mid = (hi + lo) // 2
+            x = self[mid]
+            err = x.center - query.center
+            if err == 0 or x.contains_interval(query):
+                match = x
+                break
+            elif (hi - 1) == lo:
+                best_err = abs(err)
+                best_i = mid
+                if mid < (n - 1):
+                    err = abs(self[mid + 1].center - query.center)
+                    if err < best_err:
+                        best_err = err
+                        best_i = mid + 1
+                if mid > 0:
+                    err = abs(self[mid - 1].center - query.center)
+                    if err < best_err:
+                        best_err = err
+                        best_i = mid - 1
+                match = self[best_i]
+                break
+            elif err > 0:
+                hi = mid
+            else:
+                lo = mid
+        if match is not None:
+            self._touch(match)
+        return match
+
+    def insert_interval(self, interval):
+        if self.current_size == self.max_size:
+            lru_interval = self.lru.pop()
+            self.intervals = [x for x in self.intervals if x is not lru_interval]
+            self.current_size -= 1
+        center = interval.center
+        n = len(self)
+        if n != 0:
+            index, matched = self.find_insertion_point(center)
+            index += 1
+            if matched and self[index - 1].overlaps(interval):
+                return self.extend_interval(self[index - 1], interval)
+            if index < n and interval.overlaps(self[index]):
+                return self.extend_interval(self[index], interval)
+            if index == 1:
+                if self[index - 1].center > center:
+                    index -= 1
+        else:
+            index = 0
+        self.intervals.insert(index, interval)
+        self._touch(interval)
+        self.current_size += 1
+        return interval
+
+    def extend_interval(self, target, expansion):
+        self._forget(target)
+        target.extend(expansion)
+        i, _ = self.find_insertion_point(target.center)
+        consolidate = False
+        if i > 0:
+            consolidate |= self[i - 1].overlaps(target)
+        if i < len(self) - 1:
+            consolidate |= self[i + 1].overlaps(target)
+        if consolidate:
+            self.consolidate()
+            result = self.find_interval(target)
+        else:
+            result = target
+        self._touch(result)
+        return result
+
+    def clear(self):
+        self.intervals = []
+        self.lru = []
+        self.current_size = 0
+
+    def consolidate(self):
+        intervals = list(self.intervals)
+        self.clear()
+        if len(intervals) == 0:
+            return
+        result = []
+        last = intervals[0]
+        for current in intervals[1:]:
+            if last.overlaps(current):
+                last.extend(current)
+            else:
+                result.append(last)
+                last = current
+        result.append(last)
+        for r in result:
+            self.insert_interval(r)
+        self.current_size = len(self)
+
+
+def _bounds(intervals):
+    return [(x.start, x.end) for x in intervals]
+
+
+def _lru_order(interval_set):
+    head = interval_set.lru.head
+    order = []
+    interval = head.lru_forward
+    while interval is not head:
+        order.append(interval)
+        interval = interval.lru_forward
+    return order
+
+
+class LRUIntervalSetTest(unittest.TestCase):
+
+    def _random_interval(self, rng):
+        # Half-unit bounds so that intervals often share an edge or a center
+        start = rng.randint(0, 400) / 2.
+        return _Interval(start, start + rng.randint(1, 12) / 2.)
+
+    def assert_same_state(self, interval_set, reference):
+        self.assertEqual(_bounds(interval_set), _bounds(reference.intervals))
+        self.assertEqual(_bounds(_lru_order(interval_set)), _bounds(reference.lru))
+        self.assertEqual(interval_set.current_size, reference.current_size)
+        self.assertEqual(interval_set._get_centers(), [x.center for x in interval_set])
+        for interval in interval_set:
+            self.assertIn(interval, interval_set.lru)
+
+    def test_matches_reference(self):
+        for seed in range(30):
+            rng = random.Random(seed)
+            max_size = rng.choice([3, 8, 25])
+            interval_set = intervals.LRUIntervalSet(max_size=max_size)
+            reference = _ReferenceLRUIntervalSet(max_size)
+            for _ in range(150):
+                action = rng.random()
+                if action < 0.55:
+                    interval = self._random_interval(rng)
+                    interval_set.insert_interval(interval)
+                    reference.insert_interval(interval.copy())
+                elif action < 0.85:
+                    query = _Interval(*sorted([rng.randint(0, 420) / 2., rng.randint(0, 420) / 2.]))
+                    found = interval_set.find_interval(query)
+                    expected = reference.find_interval(query.copy())
+                    self.assertEqual(_bounds([found] if found else []), _bounds([expected] if expected else []))
+                elif len(reference) > 0:
+                    i = rng.randrange(len(reference))
+                    expansion = self._random_interval(rng)
+                    extended = interval_set.extend_interval(interval_set[i], expansion)
+                    expected = reference.extend_interval(reference[i], expansion.copy())
+                    self.assertEqual(_bounds([extended]), _bounds([expected]))
+                self.assert_same_state(interval_set, reference)
+                self.assertLessEqual(len(interval_set), max_size)
+
+    def test_eviction_order(self):
+        interval_set = intervals.LRUIntervalSet(max_size=3)
+        a, b, c, d = [_Interval(i * 10., i * 10. + 1) for i in range(4)]
+        for x in (a, b, c):
+            interval_set.insert_interval(x)
+        self.assertIs(interval_set.find_interval(_Interval(0.2, 0.4)), a)
+        interval_set.insert_interval(d)
+        self.assertEqual(list(interval_set), [a, c, d])
+        self.assertNotIn(b, interval_set.lru)
+        self.assertEqual(_lru_order(interval_set), [d, a, c])
+
+    def test_extend_relinks(self):
+        interval_set = intervals.LRUIntervalSet(max_size=5)
+        a, b, c = [_Interval(i * 10., i * 10. + 1) for i in range(3)]
+        for x in (a, b, c):
+            interval_set.insert_interval(x)
+        # Extending b across c merges them, and the merged interval is the most recent
+        merged = interval_set.extend_interval(b, _Interval(10.5, 20.5))
+        self.assertEqual(_bounds(interval_set), [(0., 1.), (10., 21.)])
+        self.assertIs(_lru_order(interval_set)[0], merged)
+        self.assertEqual(len(_lru_order(interval_set)), 2)
+        self.assertEqual(interval_set.current_size, 2)
+
+    def test_consolidate_and_clear(self):
+        members = [_Interval(0., 2.), _Interval(1., 3.), _Interval(5., 6.), _Interval(6., 8.), _Interval(9., 9.5)]
+        interval_set = intervals.LRUIntervalSet(members, max_size=10)
+        interval_set.consolidate()
+        self.assertEqual(_bounds(interval_set), [(0., 3.), (5., 8.), (9., 9.5)])
+        self.assertEqual(_bounds(_lru_order(interval_set)), [(9., 9.5), (5., 8.), (0., 3.)])
+        self.assertEqual(interval_set.current_size, 3)
+        interval_set.clear()
+        self.assertEqual(len(interval_set), 0)
+        self.assertEqual(_lru_order(interval_set), [])
+        for x in members:
+            self.assertNotIn(x, interval_set.lru)
+        with self.assertRaises(ValueError):
+            interval_set.lru.get_least_recently_used()
+
+
+class IntervalSetConsolidateTest(unittest.TestCase):
+
+    def test_matches_reference(self):
+        rng = random.Random(7)
+        for _ in range(200):
+            bounds = []
+            for _ in range(rng.randint(0, 30)):
+                start = rng.randint(0, 100) / 2.
+                bounds.append((start, start + rng.randint(0, 20) / 2.))
+            interval_set = intervals.IntervalSet([_Interval(*b) for b in bounds])
+            reference = _ReferenceLRUIntervalSet(max_size=None)
+            reference.intervals = sorted([_Interval(*b) for b in bounds], key=lambda x: x.center)
+            interval_set.consolidate()
+            reference.consolidate()
+            self.assertEqual(_bounds(interval_set), _bounds(reference.intervals))
+            self.assertEqual(interval_set._get_centers(), [x.center for x in interval_set])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import random
+import unittest
+
+import numpy as np
+
+from ms_deisotope.peak_set import DeconvolutedPeak, DeconvolutedPeakSet
+
+from glycan_profiling.tandem.peptide.scoring.localize import AScoreEvaluator
+
+
+class _Fragment(object):
+    def __init__(self, mass):
+        self.mass = mass
+
+
+class _Scan(object):
+    def __init__(self, peaks):
+        self.deconvoluted_peak_set = DeconvolutedPeakSet(peaks)
+        self.deconvoluted_peak_set.reindex()
+
+
+def _count_nested(peak_windows, fragments, depth, error_tolerance):
+    # Walk the fragments and peak windows together, testing each fragment against the
+    # first `depth` peaks of its window, as the matcher did before the arrays were flattened.
+    n = 0
+    window_i = 0
+    window_n = len(peak_windows)
+    current_window = peak_windows[window_i]
+    for frag in fragments:
+        while not current_window or (frag.mass >= (current_window.max_mass + 1)):
+            window_i += 1
+            if window_i == window_n:
+                return n
+            current_window = peak_windows[window_i]
+        for peak in current_window[:depth]:
+            if abs(peak.neutral_mass - frag.mass) / frag.mass < error_tolerance:
+                n += 1
+    return n
+
+
+class AScoreMatchCountTest(unittest.TestCase):
+
+    def _make_evaluator(self, masses, rng):
+        peaks = [
+            DeconvolutedPeak(mass, rng.uniform(1e2, 1e5), 1, 10, -1, 0.01)
+            for mass in sorted(masses)]
+        evaluator = AScoreEvaluator.__new__(AScoreEvaluator)
+        evaluator.scan = _Scan(peaks)
+        return evaluator
+
+    def _make_fragments(self, masses, rng):
+        fragments = []
+        for mass in masses:
+            if rng.random() < 0.6:
+                fragments.append(_Fragment(mass * (1 + rng.uniform(-1.5e-5, 1.5e-5))))
+        for _ in range(20):
+            fragments.append(_Fragment(rng.uniform(100, 1100)))
+        fragments.sort(key=lambda x: x.mass)
+        return fragments
+
+    def assert_counts_match(self, evaluator, fragments, error_tolerance):
+        depths = np.arange(0, 13)
+        expected = [
+            _count_nested(evaluator.peak_windows, fragments, depth, error_tolerance)
+            for depth in depths]
+        observed = [
+            evaluator.match_ions(fragments, depth, error_tolerance=error_tolerance)
+            for depth in depths]
+        self.assertEqual(observed, expected)
+        lo, hi = evaluator._match_bounds(
+            np.array([f.mass for f in fragments]), error_tolerance)
+        self.assertEqual(evaluator._count_matches(lo, hi, depths).tolist(), expected)
+
+    def test_randomized_counts(self):
+        rng = random.Random(11)
+        for _ in range(40):
+            masses = [rng.uniform(150, 950) for _ in range(rng.randint(5, 60))]
+            # Peaks on a window edge fall in both of the windows that share it
+            masses.extend(rng.sample([200.0, 300.0, 400.0, 500.0, 600.0], 2))
+            evaluator = self._make_evaluator(masses, rng)
+            fragments = self._make_fragments(masses, rng)
+            for error_tolerance in (1e-5, 2e-5):
+                self.assert_counts_match(evaluator, fragments, error_tolerance)
+
+    def test_peak_shared_by_adjacent_windows(self):
+        rng = random.Random(3)
+        evaluator = self._make_evaluator([150.0, 180.0, 200.0, 250.0, 260.0], rng)
+        shared = [window for window in evaluator.peak_windows
+                  if any(abs(peak.neutral_mass - 200.0) < 1e-9 for peak in window)]
+        self.assertEqual(len(shared), 2)
+        # A fragment at the shared peak belongs to the lower window only, so it is counted once
+        fragments = [_Fragment(200.0 * (1 + 5e-6)), _Fragment(250.0), _Fragment(260.0 * (1 - 5e-6))]
+        self.assert_counts_match(evaluator, fragments, 1e-5)
+        self.assertEqual(evaluator.match_ions(fragments, 10, 1e-5), 3)
+
+    def test_no_peaks(self):
+        evaluator = AScoreEvaluator.__new__(AScoreEvaluator)
+        evaluator.scan = None
+        lo, hi = evaluator._match_bounds(np.array([100.0, 200.0]))
+        self.assertEqual(evaluator._count_matches(lo, hi, np.arange(1, 11)).tolist(), [0] * 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
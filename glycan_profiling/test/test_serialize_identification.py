@@ -0,0 +1,45 @@
+import os
+import tempfile
+import unittest
+
+from glycan_profiling.serialize import DatabaseBoundOperation
+from glycan_profiling.serialize.identification import AmbiguousGlycopeptideGroup
+
+
+class AmbiguousGlycopeptideGroupTest(unittest.TestCase):
+
+    def setUp(self):
+        self.file_name = tempfile.mktemp() + '.db'
+        self.database = DatabaseBoundOperation(self.file_name)
+
+    def tearDown(self):
+        self.database.session.close()
+        self.database.engine.dispose()
+        os.remove(self.file_name)
+
+    def _stored_ids(self, analysis_id):
+        table = AmbiguousGlycopeptideGroup.__table__
+        return [row[0] for row in self.database.session.execute(
+            table.select().with_only_columns([table.c.id]).where(
+                table.c.analysis_id == analysis_id).order_by(table.c.id))]
+
+    def test_insert_groups(self):
+        session = self.database.session
+        table = AmbiguousGlycopeptideGroup.__table__
+        self.assertEqual(AmbiguousGlycopeptideGroup.insert_groups(session, 1, 0), [])
+        earlier = AmbiguousGlycopeptideGroup.insert_groups(session, 1, 4)
+        # Leave a gap below the largest id, which must not be reused
+        session.execute(table.delete().where(table.c.id == earlier[1]))
+        session.commit()
+
+        group_ids = AmbiguousGlycopeptideGroup.insert_groups(session, 2, 5)
+        self.assertEqual(group_ids, list(range(earlier[-1] + 1, earlier[-1] + 6)))
+        self.assertEqual(AmbiguousGlycopeptideGroup.insert_groups(session, 3, 1), [group_ids[-1] + 1])
+        session.commit()
+        self.assertEqual(self._stored_ids(2), group_ids)
+        self.assertEqual(self._stored_ids(3), [group_ids[-1] + 1])
+        self.assertEqual(self._stored_ids(1), [earlier[0]] + earlier[2:])
+
+
+if __name__ == '__main__':
+    unittest.main()
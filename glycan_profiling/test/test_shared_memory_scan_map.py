@@ -0,0 +1,72 @@
+import multiprocessing
+import pickle
+import unittest
+
+from glycan_profiling.tandem.evaluation_dispatch.utils import SharedMemoryScanMap, SharedMemory
+
+
+def _read_scans(payload, keys, queue):
+    scan_map = pickle.loads(payload)
+    try:
+        queue.put([scan_map[key] for key in keys])
+    finally:
+        scan_map.clear()
+
+
+@unittest.skipIf(SharedMemory is None, "shared memory is not available")
+class SharedMemoryScanMapTest(unittest.TestCase):
+    serialized_scans = {
+        "scan=1": b"first scan",
+        "scan=2": b"",
+        "scan=3": pickle.dumps(list(range(100)), -1),
+    }
+
+    def _read_in_child(self, method):
+        scan_map = SharedMemoryScanMap(self.serialized_scans)
+        try:
+            context = multiprocessing.get_context(method)
+            queue = context.Queue()
+            keys = list(self.serialized_scans)
+            worker = context.Process(target=_read_scans, args=(pickle.dumps(scan_map), keys, queue))
+            worker.start()
+            result = queue.get(timeout=60)
+            worker.join(60)
+            self.assertEqual(worker.exitcode, 0)
+            self.assertEqual(result, [self.serialized_scans[key] for key in keys])
+            # The child's clear() only detaches, the block still belongs to this process
+            self.assertEqual(scan_map["scan=1"], b"first scan")
+        finally:
+            scan_map.clear()
+        with self.assertRaises(FileNotFoundError):
+            SharedMemory(name=scan_map.name)
+
+    def test_lookup(self):
+        scan_map = SharedMemoryScanMap(self.serialized_scans)
+        try:
+            self.assertEqual(len(scan_map), 3)
+            self.assertEqual(set(scan_map), set(self.serialized_scans))
+            for key, payload in self.serialized_scans.items():
+                self.assertIn(key, scan_map)
+                self.assertEqual(scan_map[key], payload)
+            self.assertNotIn("scan=4", scan_map)
+        finally:
+            scan_map.clear()
+        self.assertEqual(len(scan_map), 0)
+        # Clearing again is a no-op
+        scan_map.clear()
+
+    def test_empty(self):
+        scan_map = SharedMemoryScanMap({})
+        self.assertEqual(len(scan_map), 0)
+        scan_map.clear()
+
+    @unittest.skipIf("fork" not in multiprocessing.get_all_start_methods(), "fork is not available")
+    def test_fork(self):
+        self._read_in_child("fork")
+
+    def test_spawn(self):
+        self._read_in_child("spawn")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import pickle
+import unittest
+
+from glycan_profiling.tandem.ref import SpectrumReference
+from glycan_profiling.tandem.spectrum_match import SpectrumMatch, SpectrumSolutionSet
+
+
+class _Target(object):
+    def __init__(self, id):
+        self.id = id
+
+    def __repr__(self):
+        return "_Target(%d)" % (self.id, )
+
+
+class _UnslottedSolutionSet(object):
+    """Pickles like a :class:`SpectrumSolutionSet` did before it used ``__slots__``"""
+
+    def __init__(self, state):
+        self.state = state
+
+    def __reduce__(self):
+        return object.__new__, (SpectrumSolutionSet, ), self.state
+
+
+class TestSpectrumSolutionSet(unittest.TestCase):
+
+    def _make(self, pairs):
+        scan = SpectrumReference("scan=1")
+        return SpectrumSolutionSet(
+            scan, [SpectrumMatch(scan, _Target(i), score) for i, score in pairs])
+
+    def _ids(self, solutions):
+        return [sol.target.id for sol in solutions]
+
+    def test_best_solution(self):
+        solution_set = self._make([(1, 10.0), (3, 12.0), (2, 12.0), (4, 5.0)])
+        self.assertEqual(solution_set.best_solution().target.id, 3)
+        self.assertEqual(self._ids(solution_set), [1, 3, 2, 4])
+        solution_set.sort()
+        self.assertEqual(solution_set.best_solution().target.id, 3)
+
+    def test_get_top_solutions_order(self):
+        solution_set = self._make([(1, 10.0), (2, 12.0), (3, 12.0), (4, 5.0)])
+        self.assertEqual(self._ids(solution_set.get_top_solutions()), [3, 2, 1])
+
+    def test_simplify_order(self):
+        solution_set = self._make([(1, 10.0), (2, 12.0), (3, 12.0), (4, 5.0)])
+        solution_set.simplify()
+        self.assertEqual(self._ids(solution_set), [3, 2, 1, 4])
+        self.assertEqual(self._ids(solution_set.get_top_solutions(d=10)), [3, 2, 1, 4])
+        self.assertEqual([sol.best_match for sol in solution_set], [True, True, False, False])
+
+    def test_pickle_round_trip(self):
+        solution_set = self._make([(1, 10.0), (2, 12.0), (3, 12.0)])
+        solution_set.sort()
+        solution_set._is_top_only = True
+        dup = pickle.loads(pickle.dumps(solution_set, -1))
+        self.assertEqual(self._ids(dup), self._ids(solution_set))
+        self.assertEqual(dup.scan, solution_set.scan)
+        self.assertTrue(dup._is_sorted)
+        self.assertTrue(dup._is_top_only)
+        self.assertEqual(dup.best_solution().target.id, 3)
+
+    def test_unpickle_unslotted_state(self):
+        scan = SpectrumReference("scan=1")
+        solutions = [SpectrumMatch(scan, _Target(i), score) for i, score in [(1, 10.0), (2, 12.0)]]
+        state = {
+            "scan": scan, "solutions": solutions, "_is_sorted": False, "_is_simplified": False,
+            "_is_top_only": False, "_target_map": None, "_q_value": None
+        }
+        solution_set = pickle.loads(pickle.dumps(_UnslottedSolutionSet(state), 2))
+        self.assertIsInstance(solution_set, SpectrumSolutionSet)
+        self.assertIsNone(solution_set._best)
+        self.assertEqual(solution_set.best_solution().target.id, 2)
+        self.assertEqual(self._ids(solution_set), [1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
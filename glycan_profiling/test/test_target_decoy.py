@@ -29,3 +29,75 @@ class TestNearestValueLookup(unittest.TestCase):
         for ind, val in zip(indices, values):
             q = nvl[ind]
             self.assertAlmostEqual(val, q)
+
+
+class _Match(object):
+    def __init__(self, score):
+        self.score = score
+
+
+class TestScoreThresholdCounter(unittest.TestCase):
+
+    def test_counts(self):
+        series = [_Match(x) for x in [1.0, 2.0, 2.0, 3.5, 5.0]]
+        thresholds = np.array([0.5, 1.0, 2.0, 3.0, 3.5, 5.0, 6.0])
+        counter = target_decoy.ScoreThresholdCounter(series, thresholds)
+        above = [counter.counts_above_threshold[t] for t in thresholds]
+        below = [counter.counter[t] for t in thresholds]
+        self.assertEqual(above, [5, 5, 4, 2, 2, 1, 0])
+        self.assertEqual(below, [0, 0, 1, 3, 3, 4, 5])
+
+
+class TestExpectationCorrection(unittest.TestCase):
+
+    def _summed(self, d, t, p):
+        m = np.arange(t + 1, dtype=int)
+        pi = np.exp(target_decoy._log_pi(d, m, p))
+        return (m * pi).sum() / pi.sum()
+
+    def test_matches_summation(self):
+        for p in (0.5, 0.3, 0.9):
+            for d in (0, 1, 3, 10, 50, 200):
+                for t in (1, 2, 5, 20, 100, 1000):
+                    self.assertAlmostEqual(
+                        target_decoy._expectation(d, t, p), self._summed(d, t, p), 6)
+        self.assertEqual(target_decoy._expectation(10, 0), 0)
+        self.assertEqual(target_decoy._expectation(10, None), 11)
+
+
+class TestTargetDecoyAnalyzer(unittest.TestCase):
+
+    def _make(self, targets, decoys, **kwargs):
+        return target_decoy.TargetDecoyAnalyzer(
+            [_Match(x) for x in targets], [_Match(x) for x in decoys], **kwargs)
+
+    def test_decoy_pseudocount_above_best_decoy(self):
+        tda = self._make([1.0, 2.0, 3.0, 4.0, 5.0], [0.5, 1.5, 2.5])
+        self.assertEqual(tda.n_decoys_above_threshold(2.5), 1)
+        for threshold in (3.0, 4.0, 5.0):
+            self.assertEqual(tda.n_decoys_above_threshold(threshold), 1.0)
+        self.assertAlmostEqual(tda.estimate_fdr(4.0), 0.5)
+        tda = self._make([1.0, 2.0, 3.0, 4.0, 5.0], [0.5, 1.5, 2.5], decoy_pseudocount=0.0)
+        self.assertEqual(tda.n_decoys_above_threshold(4.0), 0.0)
+
+    def test_percent_incorrect_targets_below_lowest_target(self):
+        tda = self._make([1, 2, 3, 4, 5, 6, 7, 8], [0.5, 1.5, 2.5, 3.5], with_pit=True)
+        self.assertAlmostEqual(tda.estimate_percent_incorrect_targets(1.0), 1.0)
+        self.assertGreater(tda.q_value_map[8.0], 0)
+
+    def test_no_decoys(self):
+        tda = self._make([1.0, 2.0, 3.0, 4.0, 5.0], [])
+        for threshold in (1.0, 3.0, 5.0):
+            self.assertEqual(tda.n_decoys_above_threshold(threshold), 1.0)
+        self.assertAlmostEqual(tda.estimate_fdr(1.0), 0.2)
+
+    def test_q_values(self):
+        targets = [_Match(x) for x in [1.0, 2.0, 3.0, 4.0, 5.0]]
+        tda = target_decoy.TargetDecoyAnalyzer(targets, [_Match(x) for x in [0.5, 1.5, 2.5]])
+        tda.q_values()
+        for match, q_value in zip(targets, [0.4, 0.25, 0.25, 0.25, 0.25]):
+            self.assertAlmostEqual(match.q_value, q_value)
+        tda = target_decoy.TargetDecoyAnalyzer(targets, [])
+        tda.q_values()
+        for match in targets:
+            self.assertAlmostEqual(match.q_value, 0.2)
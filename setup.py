@@ -65,6 +65,8 @@ def make_extensions():
             Extension(name='glycan_profiling._c.database.mass_collection',
                       sources=["glycan_profiling/_c/database/mass_collection.pyx"],
                       include_dirs=[numpy.get_include()]),
+            Extension(name='glycan_profiling._c.database.glycopeptide_enum',
+                      sources=["glycan_profiling/_c/database/glycopeptide_enum.pyx"]),
             Extension(name='glycan_profiling._c.tandem.tandem_scoring_helpers',
                       libraries=['npymath'],
                       library_dirs=[os.path.join(
@@ -118,6 +120,8 @@ def make_extensions():
             Extension(name='glycan_profiling._c.database.mass_collection',
                       sources=["glycan_profiling/_c/database/mass_collection.c"],
                       include_dirs=[numpy.get_include()]),
+            Extension(name='glycan_profiling._c.database.glycopeptide_enum',
+                      sources=["glycan_profiling/_c/database/glycopeptide_enum.c"]),
             Extension(name='glycan_profiling._c.tandem.tandem_scoring_helpers',
                       libraries=['npymath'],
                       library_dirs=[os.path.join(